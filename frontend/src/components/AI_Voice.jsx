@@ -250,8 +250,8 @@ export default function AI_Voice({
       socket.onopen = () => {
         console.log("🚀 STT WebSocket connected successfully!");
 
-        // 3. Setup AudioContext for PCM capture
-        const audioContext = new (window.AudioContext || window.webkitAudioContext)({ sampleRate: 44100 });
+        // 3. Setup AudioContext for PCM capture (16 kHz must match SAMPLE_RATE in assembly_streaming.py)
+        const audioContext = new (window.AudioContext || window.webkitAudioContext)({ sampleRate: 16000 });
         audioContextRef.current = audioContext;
         const source = audioContext.createMediaStreamSource(stream);
 
@@ -4,17 +4,22 @@ import logging
 import asyncio
 from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from contextlib import asynccontextmanager
 from Schemas import QueryRequest, QueryResponse, MarketChatRequest
 
 # from src.sharebot.main_sharebot import ShareBot
 from src.sharebot.agent.yfinance_agent import analyze_stock
+from src.sharebot.agent.yfinance_agent import warm_validation_cache
+from src.sharebot.agent.yfinance_agent import warm_indicator_kernels
 from src.sharebot.agent.tavily_agent import stream_analysis
 from src.sharebot.agent.tavily_agent import analyze
 
 from src.kite.portbot.chatbot import KiteChatbot
+from src.kite.mcpclient.kite_mcp_client import close_client_pool as close_mcp_client_pool
+from src.kite.portbot.tool.market_analysis import SHARED_HTTPX
 from src.kite.portrep.portreport.run_portfolio_report import main as generate_portfolio_report
+from src.kite.portrep.portreport.run_portfolio_report import warmup as warmup_portfolio_report
 
 from src.stt.assembly_streaming import VoiceToTextService
 
@@ -29,6 +34,14 @@ logger = logging.getLogger("MainAPI")
 # ─────────────────────────────────────────────
 # 🌐 Lifespan Initialization
 # ─────────────────────────────────────────────
+async def _warmup_portfolio_report():
+    try:
+        await warmup_portfolio_report()
+        logger.info("Portfolio report pipeline warmed up")
+    except Exception as e:
+        logger.warning(f"Report warmup skipped: {e}")
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     try:
@@ -46,12 +59,23 @@ async def lifespan(app: FastAPI):
         
         logger.info("Stock Buddy ready")
         
+        # Revalidate cached stock symbols in one background batch instead of per request
+        app.state.symbol_warmup = asyncio.create_task(asyncio.to_thread(warm_validation_cache))
+        # JIT-compile the indicator kernels off the request path
+        app.state.kernel_warmup = asyncio.create_task(asyncio.to_thread(warm_indicator_kernels))
+        
+        # Warm the report pipeline in the background so the first report request
+        # skips import/PDF setup without delaying startup
+        app.state.report_warmup = asyncio.create_task(_warmup_portfolio_report())
+        
         yield
         
         # Cleanup
         logger.info("Shutting down services...")
         if hasattr(app.state, "portfolio_bot"):
             await app.state.portfolio_bot.__aexit__(None, None, None)
+        await close_mcp_client_pool()
+        await SHARED_HTTPX.aclose()
     except Exception as e:
         logger.error(f"Startup error: {e}", exc_info=True)
         raise
@@ -60,6 +84,7 @@ app = FastAPI(
     title="KiteInfi API",
     version="1.0.0",
     description="Unified API for Market Chat, Portfolio Chat, and Portfolio Reports",
+    default_response_class=ORJSONResponse,
     lifespan=lifespan
 )
 
@@ -335,7 +360,7 @@ async def send_portfolio_report():
 
         # 3. Always refresh the PDF from the current HTML to ensure latest design/data
         logger.info(f"🔄 Converting report to PDF format...")
-        if not convert_html_to_pdf(html_content, pdf_file):
+        if not await asyncio.to_thread(convert_html_to_pdf, html_content, pdf_file):
             raise HTTPException(status_code=500, detail="PDF conversion failed. Please check system libraries.")
 
         # 4. Resolve Recipient & Metadata
@@ -416,7 +441,7 @@ async def stock_buddy_stream(request: QueryRequest):
     async def generate_stream():
         try:
             # Get stock analysis
-            result = analyze_stock(company_name)
+            result = await analyze_stock(company_name)
             
             if result["status"] == "error":
                 error_message = f"❌ Error: {result['error']}\n\n💡 Please try again with a different company name."
@@ -484,7 +509,7 @@ async def stock_buddy_sync(request: QueryRequest):
     
     try:
         # Get stock analysis
-        result = analyze_stock(company_name)
+        result = await analyze_stock(company_name)
         
         if result["status"] == "error":
             raise HTTPException(status_code=400, detail=result["error"])
@@ -541,9 +566,8 @@ async def stt_websocket(websocket: WebSocket):
         async def send_transcripts():
             try:
                 while True:
-                    # Non-blocking check for transcripts
-                    transcript = stt.get_transcript(timeout=0.01)
-                    if transcript:
+                    # Non-blocking check for transcripts; forward a whole burst per wake-up
+                    for transcript in stt.get_transcripts(timeout=0.01):
                         await websocket.send_json(transcript)
                     await asyncio.sleep(0.01)
             except Exception as e:
@@ -1,4 +1,3 @@
-import yfinance as yf
 import logging
 import asyncio
 import json
@@ -40,6 +39,8 @@ def get_market_indices_snapshot() -> Dict[str, Any]:
     Fetch market data from yfinance API
     This is called every 5 seconds to avoid rate limiting
     """
+    import yfinance as yf  # deferred: pulls in pandas/numpy on first use
+
     market_is_open = is_market_open()
     
     indices = {
@@ -1,57 +1,111 @@
 # src/kite/mcpclient/kite_mcp_client.py
 import json
 import asyncio
+import logging
+import operator
 import anyio
 import contextlib
+import hashlib
 import os
 import re
-import time
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
+from aiolimiter import AsyncLimiter
 from fastmcp import Client
 from fastmcp.client.transports import SSETransport
 from fastmcp.exceptions import ToolError
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+logger = logging.getLogger("KiteMCP")
+
 # Flexible URL patterns
 KITE_URL_REGEX = re.compile(r"https?://[^\s)]+kite\.[^\s)]+", re.IGNORECASE)
 GENERIC_URL_REGEX = re.compile(r"https?://[^\s)]+", re.IGNORECASE)
 
-class RateLimiter:
-    """Simple rate limiter using token bucket algorithm."""
-    
-    def __init__(self, max_requests: int = 10, time_window: float = 1.0):
-        """
-        Args:
-            max_requests: Maximum number of requests allowed in time_window
-            time_window: Time window in seconds
-        """
-        self.max_requests = max_requests
-        self.time_window = time_window
-        self.requests = []
-        self._lock = asyncio.Lock()
-    
-    async def acquire(self):
-        """Wait until a request can be made without exceeding rate limit."""
-        while True:
-            async with self._lock:
-                now = time.time()
-                
-                # Remove requests outside the time window
-                self.requests = [req_time for req_time in self.requests 
-                               if now - req_time < self.time_window]
-                
-                # If we're under the limit, record and return
-                if len(self.requests) < self.max_requests:
-                    self.requests.append(now)
-                    return
-                
-                # Calculate how long to wait until the oldest request falls out of window
-                sleep_time = self.time_window - (now - self.requests[0])
-            
-            # Wait outside the lock to prevent deadlocks
-            if sleep_time > 0:
-                print(f"⏳ Rate limit reached. Waiting {sleep_time:.2f}s...")
-                await asyncio.sleep(sleep_time)
+_TYPE_AND_TEXT = operator.attrgetter("type", "text")
+
+# Case-insensitive scans, so large payloads and error messages aren't lower()-copied
+_LOGIN_RE = re.compile(r"please log in", re.IGNORECASE)
+_RATE_LIMIT_RE = re.compile(r"429|too many requests", re.IGNORECASE)
+_CONN_ERR_RE = re.compile(r"broken|connection|closed|resource|anyio", re.IGNORECASE)
+
+# Error kinds that call() retries. Known transport failures dispatch on their type;
+# the message regexes are only a fallback for anything else.
+_RATE_LIMIT = "rate_limit"
+_CONNECTION = "connection"
+_ERROR_KINDS = {
+    anyio.ClosedResourceError: _CONNECTION,
+    anyio.BrokenResourceError: _CONNECTION,
+    anyio.EndOfStream: _CONNECTION,
+    ConnectionResetError: _CONNECTION,
+}
+# Matched by name so transport libraries (e.g. httpx) needn't be imported here
+_CONN_ERROR_NAMES = frozenset({"ClosedResourceError", "RemoteProtocolError", "EndOfStream", "ConnectionResetError"})
+
+
+def _classify_error(e: Exception) -> Optional[str]:
+    exc_type = type(e)
+    kind = _ERROR_KINDS.get(exc_type)
+    if kind is None and exc_type.__name__ in _CONN_ERROR_NAMES:
+        kind = _CONNECTION
+    if kind is not None:
+        return kind
+    error_msg = str(e)
+    if _RATE_LIMIT_RE.search(error_msg):
+        return _RATE_LIMIT
+    if _CONN_ERR_RE.search(error_msg):
+        return _CONNECTION
+    return None
+
+# Warm, still-connected (transport, client) pairs parked by close(), keyed on
+# (url, headers digest). Kite keeps the login in the server-side SSE session, so
+# only sessions that never ran the login flow are parked (see close()). Pool
+# operations never await, so on the single event loop they need no lock.
+CLIENT_POOL_SIZE = int(os.getenv("MCP_CLIENT_POOL_SIZE", "4"))
+_CLIENT_POOL: Dict[Tuple[str, str], List[Tuple[SSETransport, Client]]] = {}
+# Background disconnects started from sync code (clear_session), kept referenced until done
+_CLOSING: set = set()
+
+
+def _take_pooled(key: Tuple[str, str]) -> Optional[Tuple[SSETransport, Client]]:
+    """Pop the most recently parked client for key that is still connected."""
+    pool = _CLIENT_POOL.get(key)
+    while pool:
+        transport, client = pool.pop()
+        if client.is_connected():
+            return transport, client
+    return None
+
+
+async def _disconnect(client: Client):
+    with contextlib.suppress(Exception):
+        await client.__aexit__(None, None, None)
+
+
+def _discard_clients(clients: List[Client]):
+    """Disconnect clients from sync code: scheduled on the running loop, if any."""
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return
+    for client in clients:
+        task = loop.create_task(_disconnect(client))
+        _CLOSING.add(task)
+        task.add_done_callback(_CLOSING.discard)
+
+
+async def close_client_pool():
+    """Disconnect every parked client (call on application shutdown)."""
+    pooled = [entry for pool in _CLIENT_POOL.values() for entry in pool]
+    _CLIENT_POOL.clear()
+    for _, client in pooled:
+        with contextlib.suppress(Exception):
+            await client.__aexit__(None, None, None)
+
 
 class KiteMCPClient:
     """Stable SSE-based Zerodha Kite MCP client with rate limiting and retry logic."""
@@ -65,7 +119,8 @@ class KiteMCPClient:
         Args:
             url: MCP server URL
             headers: Optional HTTP headers
-            max_requests_per_second: Maximum requests per second (default: 1)
+            max_requests_per_second: Maximum requests per second (default: 1;
+                MCP_MAX_REQUESTS_PER_MINUTE applies a per-minute budget instead)
             max_retries: Maximum retry attempts for failed requests (default: 5)
         """
         # Priority: explicit arg > KITE_MCP_SSE_URL > MCP_SSE_URL > default
@@ -78,17 +133,33 @@ class KiteMCPClient:
             
         self.transport: Optional[SSETransport] = None
         self._client: Optional[Client] = None
+        # True once the current session has run login or validated as logged in;
+        # such a session carries the user's auth and is never parked for reuse
+        self._authenticated = False
         
-        # Rate limiting configuration
-        max_rps = max_requests_per_second or int(os.getenv("MCP_MAX_REQUESTS_PER_SECOND", "1"))
-        self.rate_limiter = RateLimiter(max_requests=max_rps, time_window=1.0)
+        # Rate limiting configuration (leaky bucket with a single fair wait queue)
+        max_rpm = os.getenv("MCP_MAX_REQUESTS_PER_MINUTE")
+        if max_requests_per_second is None and max_rpm:
+            self.rate_limiter = AsyncLimiter(int(max_rpm), 60.0)
+        else:
+            max_rps = max_requests_per_second or int(os.getenv("MCP_MAX_REQUESTS_PER_SECOND", "1"))
+            self.rate_limiter = AsyncLimiter(max_rps, 1.0)
+
+        # Cap on in-flight call_tool requests over the single SSE transport; keep it
+        # at or below the transport's HTTP connection pool size
+        self._sem = asyncio.Semaphore(int(os.getenv("MCP_MAX_CONCURRENT", "4")))
         
         # Retry configuration
         self.max_retries = max_retries or int(os.getenv("MCP_MAX_RETRIES", "5"))
         self.retry_delay = float(os.getenv("MCP_RETRY_DELAY", "2.0"))
+        # Budget for the MCP ping that decides whether a connection error needs a full reconnect;
+        # a round trip to the remote mcp.kite.trade server, so well above a LAN RTT
+        self.liveness_timeout = float(os.getenv("MCP_LIVENESS_TIMEOUT", "1.5"))
         
         # Persistence configuration
         self.session_file = os.path.join(os.getcwd(), ".kite_session.json")
+        # Hash of the headers last read from / written to session_file (None = unknown)
+        self._saved_hash: Optional[int] = None
 
     # --------------------------
     # Context Manager lifecycle
@@ -103,22 +174,43 @@ class KiteMCPClient:
     # --------------------------
     # Connect / Close
     # --------------------------
+    def _pool_key(self) -> Tuple[str, str]:
+        digest = hashlib.sha1(json.dumps(self.headers, sort_keys=True).encode()).hexdigest()
+        return self.url, digest
+
     async def connect(self):
         if self._client is None:
             # Refresh headers from disk if available
             self.restore_session()
             
-            # Always create a fresh transport and client
+            # Reuse a warm connection with the same URL and headers if one is parked
+            pooled = _take_pooled(self._pool_key())
+            if pooled:
+                self.transport, self._client = pooled
+                logger.info("♻️ Reusing pooled Kite MCP connection: %s", self.url)
+                return
+            
+            # Otherwise create a fresh transport and client
             self.transport = SSETransport(url=self.url, headers=self.headers)
             self._client = Client(self.transport)
+            self._authenticated = False
             await self._client.__aenter__()
-            print(f"🔌 Connected to Kite MCP: {self.url}")
+            logger.info("🔌 Connected to Kite MCP: %s", self.url)
 
     async def close(self, exc_type=None, exc=None, tb=None):
         """Close SSE reader and client cleanly."""
         # Auto-save before closure
         self.save_session()
         
+        # Park a healthy, never-logged-in client for reuse instead of tearing the SSE session down
+        if self._client and exc_type is None and not self._authenticated and self._client.is_connected():
+            pool = _CLIENT_POOL.setdefault(self._pool_key(), [])
+            if len(pool) < CLIENT_POOL_SIZE:
+                pool.append((self.transport, self._client))
+                self._client = None
+                self.transport = None
+                return
+        
         if self._client:
             if self.transport:
                 reader = getattr(self.transport, "reader_task", None)
@@ -132,51 +224,74 @@ class KiteMCPClient:
 
         self._client = None
         self.transport = None
+        self._authenticated = False
+
+    def _headers_hash(self) -> int:
+        return hash(tuple(sorted(self.headers.items())))
 
     def save_session(self):
-        """Save headers to disk for persistence."""
+        """Save headers to disk for persistence (skipped when unchanged since the last load/save)."""
         try:
             if not self.headers:
                 return
             
-            with open(self.session_file, "w") as f:
-                json.dump(self.headers, f)
-            print(f"💾 Kite session saved to {self.session_file}")
+            current = self._headers_hash()
+            if current == self._saved_hash:
+                return
+            
+            payload = orjson.dumps(self.headers) if orjson is not None else json.dumps(self.headers).encode()
+            tmp_file = self.session_file + ".tmp"
+            with open(tmp_file, "wb") as f:
+                f.write(payload)
+            os.replace(tmp_file, self.session_file)
+            self._saved_hash = current
+            logger.info("💾 Kite session saved to %s", self.session_file)
         except Exception as e:
-            print(f"⚠️ Error saving session: {e}")
+            logger.warning("⚠️ Error saving session: %s", e)
 
     def restore_session(self) -> bool:
         """Load headers from disk."""
         try:
             if os.path.exists(self.session_file):
-                with open(self.session_file, "r") as f:
-                    saved_headers = json.load(f)
-                    if saved_headers:
-                        self.headers.update(saved_headers)
-                        print("📂 Kite session restored from disk.")
-                        return True
+                with open(self.session_file, "rb") as f:
+                    raw = f.read()
+                saved_headers = orjson.loads(raw) if orjson is not None else json.loads(raw)
+                if saved_headers:
+                    self.headers.update(saved_headers)
+                    self._saved_hash = self._headers_hash() if self.headers == saved_headers else None
+                    logger.info("📂 Kite session restored from disk.")
+                    return True
         except Exception as e:
-            print(f"⚠️ Error restoring session: {e}")
+            logger.warning("⚠️ Error restoring session: %s", e)
         return False
 
     def clear_session(self):
         """Wipe session from disk and memory."""
         try:
-            # 1. Clear memory source of truth
+            # 1. Drop every connection that could still hold the server-side login:
+            #    the current client and anything parked under the old or new headers
+            stale_keys = {self._pool_key()}
             self.headers = {"User-Agent": "KiteInfi-Backend/1.0"}
+            stale_keys.add(self._pool_key())
+            stale = [client for key in stale_keys for _, client in _CLIENT_POOL.pop(key, ())]
+            if self._client:
+                stale.append(self._client)
+            _discard_clients(stale)
             
             # 2. Invalidate current client AND transport to force full reconnect
             self._client = None
             self.transport = None
+            self._authenticated = False
+            self._saved_hash = None
             
             # 3. Clear disk
             if os.path.exists(self.session_file):
                 os.remove(self.session_file)
-                print(f"🧹 Session file deleted: {self.session_file}")
+                logger.info("🧹 Session file deleted: %s", self.session_file)
                 
-            print("✨ Kite session cleared successfully. Ready for fresh login.")
+            logger.info("✨ Kite session cleared successfully. Ready for fresh login.")
         except Exception as e:
-            print(f"⚠️ Error clearing session: {e}")
+            logger.warning("⚠️ Error clearing session: %s", e)
 
     async def force_reconnect(self):
         """Force a complete teardown and reconnection to MCP server."""
@@ -189,17 +304,27 @@ class KiteMCPClient:
             # Reset both client and transport to ensure fresh connection
             self._client = None
             self.transport = None
+            self._authenticated = False
             
             # Small delay to allow cleanup
             await asyncio.sleep(0.1)
             
             # Reconnect with fresh transport
             await self.connect()
-            print("🔄 Force reconnection completed successfully.")
+            logger.info("🔄 Force reconnection completed successfully.")
         except Exception as e:
-            print(f"⚠️ Force reconnection failed: {e}")
+            logger.warning("⚠️ Force reconnection failed: %s", e)
             raise
 
+    async def _is_alive(self) -> bool:
+        """Cheap MCP ping on the current session; False if absent, failing or slow."""
+        if not self._client:
+            return False
+        try:
+            return bool(await asyncio.wait_for(self._client.ping(), timeout=self.liveness_timeout))
+        except Exception:
+            return False
+
     # --------------------------
     # Tool call with rate limiting and retry
     # --------------------------
@@ -213,67 +338,82 @@ class KiteMCPClient:
             try:
                 if not self._client:
                     await self.connect()
+                if tool_name == "login":
+                    # The user may finish the browser login on this session at any point
+                    self._authenticated = True
                 
-                # Apply rate limiting before each request
-                await self.rate_limiter.acquire()
-                
-                # Make the actual call
-                result = await self._client.call_tool(tool_name, args or {})
+                # Bound concurrency, apply rate limiting, then make the actual call
+                async with self._sem:
+                    async with self.rate_limiter:
+                        result = await self._client.call_tool(tool_name, args or {})
                 
                 # Success - return immediately
                 return result
                 
             except Exception as e:
                 last_error = e
-                error_msg = str(e).lower()
+                kind = _classify_error(e)
                 
                 # Check if it's a rate limit error
-                if "429" in error_msg or "too many requests" in error_msg:
+                if kind == _RATE_LIMIT:
                     if attempt < self.max_retries:
                         # Exponential backoff for rate limit errors
                         wait_time = self.retry_delay * (2 ** attempt)
                         if not silent:
-                            print(f"⚠️ Rate limit hit (429). Retrying in {wait_time:.1f}s... (attempt {attempt + 1}/{self.max_retries})")
+                            logger.warning("⚠️ Rate limit hit (429). Retrying in %.1fs... (attempt %d/%d)", wait_time, attempt + 1, self.max_retries)
                         await asyncio.sleep(wait_time)
                         continue
                     else:
                         if not silent:
-                            print(f"❌ Rate limit error after {self.max_retries} retries: {e}")
+                            logger.error("❌ Rate limit error after %d retries: %s", self.max_retries, e)
                         raise ToolError(f"Rate limit exceeded after {self.max_retries} retries. Please try again later.")
                 
                 # Check if it's a connection/protocol error
-                elif any(word in error_msg for word in ["broken", "connection", "closed", "resource", "anyio"]) or \
-                     type(e).__name__ in ["ClosedResourceError", "RemoteProtocolError", "EndOfStream", "ConnectionResetError"] or \
-                     isinstance(e, anyio.ClosedResourceError):
-                         
+                elif kind == _CONNECTION:
                     if attempt < self.max_retries:
                         wait_time = self.retry_delay * (2 ** attempt)
                         if not silent:
-                            print(f"⚠️ Connection failure ({type(e).__name__}). Retrying in {wait_time:.1f}s... (attempt {attempt + 1}/{self.max_retries})")
+                            logger.warning("⚠️ Connection failure (%s). Retrying in %.1fs... (attempt %d/%d)", type(e).__name__, wait_time, attempt + 1, self.max_retries)
                         
-                        # FORCE a complete teardown and re-initialization with fresh transport
-                        try:
-                            await self.force_reconnect()
-                        except Exception as reconnect_err:
+                        # Keep the session if it still answers a ping (transient failure);
+                        # otherwise FORCE a complete teardown and re-initialization
+                        if await self._is_alive():
                             if not silent:
-                                print(f"⚠️ Reconnection attempt failed: {reconnect_err}")
+                                logger.info("🔁 Connection still alive, retrying without reconnect.")
+                        else:
+                            try:
+                                await self.force_reconnect()
+                            except Exception as reconnect_err:
+                                if not silent:
+                                    logger.warning("⚠️ Reconnection attempt failed: %s", reconnect_err)
                         
                         await asyncio.sleep(wait_time)
                         continue
                     else:
                         if not silent:
-                            print(f"❌ Connection failure after {self.max_retries} retries: {e}")
+                            logger.error("❌ Connection failure after %d retries: %s", self.max_retries, e)
                         raise
                 
                 # For other errors, don't retry
                 else:
                     if not silent:
-                        print(f"❌ Tool error call '{tool_name}': {type(e).__name__}: {e}")
+                        logger.error("❌ Tool error call '%s': %s: %s", tool_name, type(e).__name__, e)
                     raise
         
         if last_error:
             raise last_error
 
+    async def call_many(self, specs: List[Tuple[str, Optional[Dict[str, Any]]]], silent: bool = False) -> List[Any]:
+        """
+        Submit several independent tool calls at once and return their results in order.
+
+        Each (tool_name, args) spec goes through call(), so retries still apply per call
+        and in-flight requests are bounded by the concurrency semaphore and rate limiter;
+        the fan-out costs about one round trip instead of one per tool. The first
+        failure propagates after retries, as with call().
+        """
+        return list(await asyncio.gather(*(self.call(name, args, silent=silent) for name, args in specs)))
+
     async def validate_session(self) -> bool:
         """
         Check if the current session is valid by calling a lightweight tool.
@@ -281,9 +421,10 @@ class KiteMCPClient:
         try:
             res = await self.call("get_profile", {}, silent=True)
             raw_text = self._collect_text_chunks(res)
-            if "please log in" in raw_text.lower():
-                return False
-            return True
+            valid = _LOGIN_RE.search(raw_text) is None
+            if valid:
+                self._authenticated = True
+            return valid
         except Exception:
             return False
 
@@ -293,10 +434,12 @@ class KiteMCPClient:
         contents = getattr(result, "content", None)
         if isinstance(contents, list):
             for item in contents:
-                if getattr(item, "type", "") == "text":
-                    t = getattr(item, "text", "")
-                    if t:
-                        texts.append(t)
+                try:
+                    kind, text = _TYPE_AND_TEXT(item)
+                except AttributeError:
+                    continue
+                if kind == "text" and text:
+                    texts.append(text)
         return "\n".join(texts).strip()
 
     @staticmethod
@@ -304,9 +447,16 @@ class KiteMCPClient:
         # (1) From text content
         raw_text = KiteMCPClient._collect_text_chunks(login_result)
         if raw_text:
-            m = KITE_URL_REGEX.search(raw_text) or GENERIC_URL_REGEX.search(raw_text)
-            if m:
-                return m.group(0)
+            # One scan over the payload: prefer the first Kite URL, else the first URL
+            first_url = None
+            for m in GENERIC_URL_REGEX.finditer(raw_text):
+                url = m.group(0)
+                if KITE_URL_REGEX.fullmatch(url):
+                    return url
+                if first_url is None:
+                    first_url = url
+            if first_url:
+                return first_url
 
         # (2) Try JSON payloads
         for attr in ("structured_content", "data"):
@@ -124,6 +124,10 @@ class MasterAgent:
         return self
 
     async def __aexit__(self, exc_type, exc, tb):
+        market_agent = self.agents.get("market_analysis")
+        if market_agent:
+            await market_agent.aclose()
+
         if self.kite_client:
             # save_session() is now called internally by kite_client.close()
             # which is called by __aexit__
@@ -1,17 +1,90 @@
 # src/kite/portbot/tool/market_analysis.py
 import os
+import re
 import time
-from typing import Any, Dict, Optional, List
-from datetime import datetime
+import asyncio
+import httpx
+from typing import Any, Dict, Optional, List, Tuple
+from cachetools import TTLCache
 from dotenv import load_dotenv
 
 load_dotenv(override=True)
 
 from src.kite.portbot.base import Agent
-from tavily import TavilyClient
 from src.utils.llm_balancer import balancer
+from src.utils.dates import today_str
 from groq import AsyncGroq
 
+TAVILY_SEARCH_URL = "https://api.tavily.com/search"
+
+# Report length budget: the full 2000 tokens only when the research context is large
+# enough to support it; thin context gets a shorter cap to avoid over-generation
+MAX_REPORT_TOKENS = 2000
+SMALL_REPORT_TOKENS = 800
+SMALL_CONTEXT_CHARS = 2500
+
+# One shared async HTTP/2 client for Tavily and Groq: concurrent requests to the same
+# host multiplex over a single TCP+TLS connection instead of opening one each
+SHARED_HTTPX = httpx.AsyncClient(
+    http2=True,
+    limits=httpx.Limits(max_keepalive_connections=32, max_connections=64),
+    timeout=60
+)
+
+# Prompt trimming for Tavily snippets: per-snippet character cap, and the word 3-gram
+# Jaccard overlap above which a snippet is treated as a near-duplicate of one already kept
+SNIPPET_MAX_CHARS = 600
+SNIPPET_DUP_JACCARD = 0.7
+
+def _shingles(text: str) -> frozenset:
+    words = text.lower().split()
+    return frozenset(zip(words, words[1:], words[2:]))
+
+def _condense_results(results: List[Dict[str, Any]]) -> List[Tuple[str, str]]:
+    """
+    (title, content) pairs for the LLM prompt: each content cut to SNIPPET_MAX_CHARS at a
+    word boundary, sentences already seen in an earlier snippet dropped, and snippets that
+    mostly repeat a kept one skipped.
+    """
+    kept: List[Tuple[str, str]] = []
+    kept_shingles: List[frozenset] = []
+    seen_sentences = set()
+    for result in results:
+        content = result.get("content") or ""
+        if len(content) > SNIPPET_MAX_CHARS:
+            content = content[:SNIPPET_MAX_CHARS].rsplit(" ", 1)[0]
+        
+        sentences = []
+        for sentence in content.split(". "):
+            key = sentence.strip().lower()
+            if key and key not in seen_sentences:
+                seen_sentences.add(key)
+                sentences.append(sentence)
+        content = ". ".join(sentences)
+        
+        shingles = _shingles(content)
+        if not content or any(
+            len(shingles & other) / len(shingles | other) > SNIPPET_DUP_JACCARD
+            for other in kept_shingles if shingles or other
+        ):
+            continue
+        kept.append((result.get("title", ""), content))
+        kept_shingles.append(shingles)
+    return kept
+
+def _format_context(search_results: Dict[str, Any]) -> str:
+    """
+    Numbered prompt context from condensed search results. Built once per result and kept
+    on the dict, which is the object shared through the search cache.
+    """
+    context = search_results.get("_research_context")
+    if context is None:
+        context = search_results["_research_context"] = "\n\n".join(
+            f"[{i}] Title: {title}\nContent: {content}"
+            for i, (title, content) in enumerate(_condense_results(search_results['results']), 1)
+        )
+    return context
+
 class MarketAnalysisAgent(Agent):
     """
     Market analysis agent using Tavily for deep research.
@@ -52,6 +125,40 @@ class MarketAnalysisAgent(Agent):
         "tradingview.com"
     ]
 
+    # Query keyword groups, each matched in a single case-insensitive scan (substring semantics)
+    _INDIA_RE = re.compile(r"india|indian|nse|bse|nifty|sensex", re.I)
+    _IPO_RE = re.compile(r"ipo", re.I)
+    _PRICE_RE = re.compile(r"price|current|today|latest", re.I)
+
+    ANALYSIS_SYSTEM_PROMPT = """You are 'Market Mentor', a Senior Indian Equity Research Analyst.
+Your goal is to provide professional, objective, and data-driven stock analysis for the Indian market.
+
+**Guidelines:**
+- Professional English only (use Indian terms like lakhs/crores where appropriate)
+- Use search data as the primary source of truth - cite specific numbers and dates
+- Structure: Use clean Markdown with headers and tables
+- Tone: Technical, precise, and confident
+- FOCUS: Indian markets (NSE, BSE), rupee-denominated analysis.
+
+**Format:**
+1. **Investment Verdict** (Buy/Hold/Sell with clear technical rationale)
+2. **Recent Performance** (Key price levels, returns, and news)
+3. **Fundamental Insights** (Valuation, health, catalysts)
+4. **Risk Factors** (Concentration, market risks)
+5. **12-Month Outlook**
+"""
+
+    RESEARCH_SYSTEM_PROMPT = """You are a senior Financial Research Specialist for the Indian Market.
+Provide a comprehensive, professional research summary on the requested topic.
+
+**Guidelines:**
+- Professional, objective tone
+- Clean Markdown format with relevant headers
+- Use Indian financial terminology and contexts
+- Cite key findings from the context
+- Provide actionable insights if relevant
+"""
+
     def __init__(self, kite_client=None, shared_state=None):
         super().__init__(shared_state)
         self.kite_client = kite_client
@@ -60,17 +167,34 @@ class MarketAnalysisAgent(Agent):
         tavily_key = os.getenv("TAVILY_API_KEY")
         if not tavily_key:
             raise ValueError("TAVILY_API_KEY not found in environment")
-        self.tavily_client = TavilyClient(api_key=tavily_key)
+        self._tavily_headers = {"Authorization": f"Bearer {tavily_key}"}
         
         # Groq keys are handled by the balancer
         if balancer.key_count == 0:
             raise ValueError("No Groq API keys found in environment")
         
         self.model = os.getenv("GROQ_MODEL", "llama-3.3-70b-versatile")
+        
+        # One AsyncGroq per API key, reused across calls (all on SHARED_HTTPX)
+        self._groq_clients: Dict[str, AsyncGroq] = {}
+        
+        # Tavily results keyed on (enhanced_query, topic, max_results, days); concurrent
+        # misses for the same key wait on one per-key lock so only one request goes out
+        self._search_cache = TTLCache(maxsize=512, ttl=int(os.getenv("SEARCH_CACHE_TTL", "300")))
+        self._search_locks: Dict[tuple, asyncio.Lock] = {}
 
     def _get_groq_client(self):
-        """Get a fresh AsyncGroq client with the next available API key"""
-        return AsyncGroq(api_key=balancer.get_next_key())
+        """Get the cached AsyncGroq client for the next available API key"""
+        key = balancer.get_next_key()
+        client = self._groq_clients.get(key)
+        if client is None:
+            client = self._groq_clients[key] = AsyncGroq(api_key=key, http_client=SHARED_HTTPX)
+        return client
+
+    async def aclose(self):
+        """Drop the cached Groq clients (call on shutdown)"""
+        # Closing an AsyncGroq would close SHARED_HTTPX, which outlives this agent
+        self._groq_clients.clear()
 
     async def run(self, tool_name: str, **kwargs):
         """Execute the specified tool"""
@@ -82,43 +206,110 @@ class MarketAnalysisAgent(Agent):
             return await self._research_topic(**kwargs)
         raise ValueError(f"Unknown tool: {tool_name}")
 
-    def _internet_search(self, query: str, max_results: int = 8, topic: str = "finance", days: int = 7) -> Dict[str, Any]:
+    async def run_many(self, calls: List[Tuple[str, Dict[str, Any]]]) -> List[Any]:
+        """Execute several independent tools concurrently; results keep the order of calls"""
+        return list(await asyncio.gather(*(self.run(name, **kwargs) for name, kwargs in calls)))
+
+    async def _complete(self, groq_client, system_prompt: str, user_prompt: str, context_chars: int) -> str:
+        """
+        Stream a Groq completion and return the full text. Each chunk is also passed to
+        shared_state["on_token"] (sync or async callable) when set. Nothing sets it yet:
+        KiteChatbot narrates the finished result in a second pass (and run_many can
+        produce several reports at once), so this is only a hook for a caller that
+        wants to render a single report as it is generated.
+        """
+        max_tokens = SMALL_REPORT_TOKENS if context_chars < SMALL_CONTEXT_CHARS else MAX_REPORT_TOKENS
+        stream = await groq_client.chat.completions.create(
+            model=self.model,
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt}
+            ],
+            max_tokens=max_tokens,
+            temperature=0.3,
+            stream=True
+        )
+        
+        on_token = self.shared_state.get("on_token")
+        parts = []
+        async for chunk in stream:
+            token = chunk.choices[0].delta.content if chunk.choices else None
+            if not token:
+                continue
+            parts.append(token)
+            if on_token:
+                result = on_token(token)
+                if asyncio.iscoroutine(result):
+                    await result
+        return "".join(parts)
+
+    async def _internet_search(self, query: str, max_results: int = 8, topic: str = "finance", days: int = 7) -> Dict[str, Any]:
         """Run Tavily search with Indian market enhancements"""
         try:
-            current_date = datetime.now().strftime("%B %d, %Y")
-            lower_query = query.lower()
+            current_date = today_str()
             
             # Enhance query for Indian focus if not present
             enhanced_query = query
-            if not any(word in lower_query for word in ["india", "indian", "nse", "bse", "nifty", "sensex"]):
+            if not self._INDIA_RE.search(query):
                 enhanced_query = f"{query} India NSE BSE"
             
             # IPO Optimization
-            if "ipo" in lower_query:
+            if self._IPO_RE.search(query):
                 enhanced_query = f"latest current open upcoming IPO India today {current_date} ipowatch.in NSE BSE"
-            elif any(word in lower_query for word in ["price", "current", "today", "latest"]):
+            elif self._PRICE_RE.search(query):
                 enhanced_query = f"{enhanced_query} today {current_date} latest stock price"
 
-            return self.tavily_client.search(
-                query=enhanced_query,
-                search_depth="advanced",
-                topic=topic,
-                max_results=max_results,
-                include_answer=True,
-                include_raw_content=False,
-                days=days,
-                include_domains=self.INDIAN_FINANCE_DOMAINS
-            )
+            cache_key = (enhanced_query, topic, max_results, days)
+            cached = self._search_cache.get(cache_key)
+            if cached is not None:
+                return cached
+            
+            lock = self._search_locks.setdefault(cache_key, asyncio.Lock())
+            try:
+                async with lock:
+                    cached = self._search_cache.get(cache_key)
+                    if cached is not None:
+                        return cached
+                    
+                    result = await self._tavily_search(enhanced_query, max_results, topic, days)
+                    # Only cache useful answers so an empty/failed search is retried next time
+                    if result.get("results"):
+                        self._search_cache[cache_key] = result
+                    return result
+            finally:
+                if not lock.locked():
+                    self._search_locks.pop(cache_key, None)
         except Exception as e:
             print(f"Tavily search error: {e}")
             return {"results": [], "answer": ""}
 
+    async def _tavily_search(self, enhanced_query: str, max_results: int, topic: str, days: int) -> Dict[str, Any]:
+        """POST a search to the Tavily API"""
+        payload = {
+            "query": enhanced_query,
+            "search_depth": "advanced",
+            "topic": topic,
+            "max_results": max_results,
+            "include_answer": True,
+            "include_raw_content": False,
+            "days": days,
+            "include_domains": self.INDIAN_FINANCE_DOMAINS
+        }
+        response = await SHARED_HTTPX.post(TAVILY_SEARCH_URL, json=payload, headers=self._tavily_headers)
+        response.raise_for_status()
+        return response.json()
+
     async def _analyze_stock(self, symbol: str, context: Optional[str] = None) -> Dict[str, Any]:
         """Deep stock analysis with Tavily research (Indian Market Focused)."""
         try:
             # Search for stock information
             query = f"{symbol} stock financial performance news outlook analysis"
-            search_results = self._internet_search(query, max_results=8, topic="finance", days=14)
+            search_task = asyncio.create_task(self._internet_search(query, max_results=8, topic="finance", days=14))
+            
+            # Prepare the LLM side while the search is in flight
+            system_prompt = self.ANALYSIS_SYSTEM_PROMPT
+            groq_client = self._get_groq_client()
+            search_results = await search_task
             
             if not search_results.get('results'):
                 return {
@@ -129,31 +320,10 @@ class MarketAnalysisAgent(Agent):
                 }
             
             # Build context from search results
-            research_context = "\n\n".join([
-                f"[{i+1}] Title: {result['title']}\nContent: {result['content']}"
-                for i, result in enumerate(search_results['results'])
-            ])
+            research_context = _format_context(search_results)
             ai_answer = search_results.get("answer", "")
             
             # Generate analysis using Groq
-            system_prompt = """You are 'Market Mentor', a Senior Indian Equity Research Analyst.
-Your goal is to provide professional, objective, and data-driven stock analysis for the Indian market.
-
-**Guidelines:**
-- Professional English only (use Indian terms like lakhs/crores where appropriate)
-- Use search data as the primary source of truth - cite specific numbers and dates
-- Structure: Use clean Markdown with headers and tables
-- Tone: Technical, precise, and confident
-- FOCUS: Indian markets (NSE, BSE), rupee-denominated analysis.
-
-**Format:**
-1. **Investment Verdict** (Buy/Hold/Sell with clear technical rationale)
-2. **Recent Performance** (Key price levels, returns, and news)
-3. **Fundamental Insights** (Valuation, health, catalysts)
-4. **Risk Factors** (Concentration, market risks)
-5. **12-Month Outlook**
-"""
-            
             user_prompt = f"""**Stock**: {symbol}
 {"**User Portfolio Position Details**: " + context if context else ""}
 
@@ -164,18 +334,7 @@ Your goal is to provide professional, objective, and data-driven stock analysis
 
 Provide a comprehensive professional report following the guidelines."""
             
-            groq_client = self._get_groq_client()
-            response = await groq_client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                max_tokens=2000,
-                temperature=0.3
-            )
-            
-            analysis = response.choices[0].message.content
+            analysis = await self._complete(groq_client, system_prompt, user_prompt, len(research_context))
             sources = [{"title": r["title"], "url": r["url"]} for r in search_results['results']]
             
             return {
@@ -203,7 +362,7 @@ Provide a comprehensive professional report following the guidelines."""
     async def _get_market_news(self, query: str) -> Dict[str, Any]:
         """Get latest market news with Indian market focus."""
         try:
-            search_results = self._internet_search(query, max_results=6, topic="news")
+            search_results = await self._internet_search(query, max_results=6, topic="news")
             
             if not search_results.get('results'):
                 return {
@@ -244,7 +403,12 @@ Provide a comprehensive professional report following the guidelines."""
     async def _research_topic(self, query: str) -> Dict[str, Any]:
         """Deep research on any financial topic in the Indian Market."""
         try:
-            search_results = self._internet_search(query, max_results=8, topic="finance", days=30)
+            search_task = asyncio.create_task(self._internet_search(query, max_results=8, topic="finance", days=30))
+            
+            # Prepare the LLM side while the search is in flight
+            system_prompt = self.RESEARCH_SYSTEM_PROMPT
+            groq_client = self._get_groq_client()
+            search_results = await search_task
             
             if not search_results.get('results'):
                 return {
@@ -254,23 +418,9 @@ Provide a comprehensive professional report following the guidelines."""
                     "summary": None
                 }
             
-            research_context = "\n\n".join([
-                f"[{i+1}] Title: {result['title']}\nContent: {result['content']}"
-                for i, result in enumerate(search_results['results'])
-            ])
+            research_context = _format_context(search_results)
             ai_answer = search_results.get("answer", "")
             
-            system_prompt = """You are a senior Financial Research Specialist for the Indian Market.
-Provide a comprehensive, professional research summary on the requested topic.
-
-**Guidelines:**
-- Professional, objective tone
-- Clean Markdown format with relevant headers
-- Use Indian financial terminology and contexts
-- Cite key findings from the context
-- Provide actionable insights if relevant
-"""
-            
             user_prompt = f"""**Research Topic**: {query}
 
 **AI Preliminary Summary**: {ai_answer}
@@ -280,18 +430,7 @@ Provide a comprehensive, professional research summary on the requested topic.
 
 Provide a detailed professional research report."""
             
-            groq_client = self._get_groq_client()
-            response = await groq_client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                max_tokens=2000,
-                temperature=0.3
-            )
-            
-            research = response.choices[0].message.content
+            research = await self._complete(groq_client, system_prompt, user_prompt, len(research_context))
             sources = [{"title": r["title"], "url": r["url"]} for r in search_results['results']]
             
             return {
@@ -1,4 +1,6 @@
 import os
+import json
+import asyncio
 from typing import Literal, Dict, Any, List
 from tavily import AsyncTavilyClient
 from groq import AsyncGroq
@@ -7,8 +9,28 @@ from datetime import datetime
 
 from src.utils.llm_balancer import balancer
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 load_dotenv(override=True)
 
+ANALYSIS_MODEL = "llama-3.3-70b-versatile"
+ASSET_MAX_TOKENS = 1500
+
+ASSET_SYSTEM_PROMPT = """You are a senior financial analyst at a top-tier Indian investment firm. Your task is to provide a professional, data-driven equity research report.
+        
+        **Tone**: Formal, objective, and authoritative. Use professional Indian financial terminology.
+        **Format**: Clean Markdown. **DO NOT use emojis.**
+        **Structure**:
+            1. **Investment Verdict**: Buy / Sell / Hold / Accumulate (with a concise rationale).
+            2. **Financial Health Assessment**: Analyze key metrics (P/E, EPS, Debt-to-Equity, EBITDA) from the context.
+            3. **Key Catalysts & Risks**: Recent earnings, regulatory changes (SEBI), or macroeconomic factors.
+            4. **Position Analysis**: Evaluate the user's specific holding (provided in prompt). Recommend actionable steps based on Indian market conditions.
+            5. **Outlook**: 12-month forecast based on fundamentals and sector trends.
+        """
+
 class DeepAgent:
     def __init__(self):
         self.tavily_api_key = os.environ.get("TAVILY_API_KEY")
@@ -18,6 +40,8 @@ class DeepAgent:
             raise ValueError("Missing TAVILY_API_KEY or GROQ_API_KEYS (or GROQ_API_KEY) environment variables")
 
         self.tavily_client = AsyncTavilyClient(api_key=self.tavily_api_key)
+        # One AsyncGroq per key so concurrent analyses share its connection pool
+        self._groq_clients: Dict[str, AsyncGroq] = {}
         
         # High-quality Indian financial domains for accurate research
         self.indian_domains = [
@@ -33,8 +57,12 @@ class DeepAgent:
         ]
 
     def _get_groq_client(self):
-        """Get a fresh AsyncGroq client with the next available API key"""
-        return AsyncGroq(api_key=balancer.get_next_key())
+        """Get the AsyncGroq client for the next available API key"""
+        key = balancer.get_next_key()
+        client = self._groq_clients.get(key)
+        if client is None:
+            client = self._groq_clients[key] = AsyncGroq(api_key=key)
+        return client
 
     async def internet_search(
         self,
@@ -68,59 +96,121 @@ class DeepAgent:
             print(f"Error during search: {e}")
             return {"results": []}
 
-    async def analyze_asset(self, asset_name: str, asset_type: str, position_details: str) -> str:
-        """
-        Conducts research and generates a report for a specific asset using AsyncGroq.
-        """
-        query = f"Analyze {asset_name} {asset_type} financial performance news future outlook"
-        print(f"Researching: {asset_name}...")
-        
-        search_results = await self.internet_search(query, topic="finance")
-        
-        if not search_results.get('results'):
-            return "No search results found. Unable to generate analysis."
+    def _research_query(self, asset_name: str, asset_type: str) -> str:
+        return f"Analyze {asset_name} {asset_type} financial performance news future outlook"
 
-        context = "\n\n".join([
+    def _build_context(self, search_results: Dict[str, Any]) -> str:
+        return "\n\n".join([
             f"Title: {result['title']}\nURL: {result['url']}\nContent: {result['content']}"
             for result in search_results['results']
         ])
-        
-        system_prompt = """You are a senior financial analyst at a top-tier Indian investment firm. Your task is to provide a professional, data-driven equity research report.
-        
-        **Tone**: Formal, objective, and authoritative. Use professional Indian financial terminology.
-        **Format**: Clean Markdown. **DO NOT use emojis.**
-        **Structure**:
-            1. **Investment Verdict**: Buy / Sell / Hold / Accumulate (with a concise rationale).
-            2. **Financial Health Assessment**: Analyze key metrics (P/E, EPS, Debt-to-Equity, EBITDA) from the context.
-            3. **Key Catalysts & Risks**: Recent earnings, regulatory changes (SEBI), or macroeconomic factors.
-            4. **Position Analysis**: Evaluate the user's specific holding (provided in prompt). Recommend actionable steps based on Indian market conditions.
-            5. **Outlook**: 12-month forecast based on fundamentals and sector trends.
-        """
 
+    async def _generate_report(self, asset_name: str, asset_type: str, position_details: str, context: str) -> str:
         user_prompt = f"""
         **Asset**: {asset_name} ({asset_type})
         **Client Position**: {position_details}
-        
+
         **Market Data & News**:
         {context}
-        
+
         Generate the research report following the strict guidelines above. Ensure it reflects the latest Indian market sentiments.
         """
 
         try:
             groq_client = self._get_groq_client()
             response = await groq_client.chat.completions.create(
-                model="llama-3.3-70b-versatile",
+                model=ANALYSIS_MODEL,
                 messages=[
-                    {"role": "system", "content": system_prompt},
+                    {"role": "system", "content": ASSET_SYSTEM_PROMPT},
                     {"role": "user", "content": user_prompt}
                 ],
-                max_tokens=1500
+                max_tokens=ASSET_MAX_TOKENS
             )
             return response.choices[0].message.content
         except Exception as e:
             return f"Error generating analysis: {e}"
 
+    async def analyze_asset(self, asset_name: str, asset_type: str, position_details: str) -> str:
+        """
+        Conducts research and generates a report for a specific asset using AsyncGroq.
+        """
+        print(f"Researching: {asset_name}...")
+
+        search_results = await self.internet_search(self._research_query(asset_name, asset_type), topic="finance")
+
+        if not search_results.get('results'):
+            return "No search results found. Unable to generate analysis."
+
+        return await self._generate_report(
+            asset_name, asset_type, position_details, self._build_context(search_results)
+        )
+
+    async def analyze_assets_batch(self, items: List[Dict[str, str]]) -> Dict[str, str]:
+        """
+        Researches several assets concurrently and writes all their reports in one AsyncGroq request.
+        Each item needs 'key', 'name', 'type' and 'details'; returns {key: report}.
+        Assets missing from the batched reply fall back to a single-asset request.
+        """
+        for item in items:
+            print(f"Researching: {item['name']}...")
+        searches = await asyncio.gather(*(
+            self.internet_search(self._research_query(item["name"], item["type"]), topic="finance")
+            for item in items
+        ))
+
+        analyses: Dict[str, str] = {}
+        contexts: Dict[str, str] = {}
+        for item, search_results in zip(items, searches):
+            if not search_results.get('results'):
+                analyses[item["key"]] = "No search results found. Unable to generate analysis."
+            else:
+                contexts[item["key"]] = self._build_context(search_results)
+
+        pending = [item for item in items if item["key"] in contexts]
+        if len(pending) > 1:
+            sections = "\n\n".join(
+                f"""### {item['key']}
+        **Asset**: {item['name']} ({item['type']})
+        **Client Position**: {item['details']}
+
+        **Market Data & News**:
+        {contexts[item['key']]}"""
+                for item in pending
+            )
+            user_prompt = f"""{sections}
+
+        Generate a research report for EACH asset above following the strict guidelines. Ensure each reflects the latest Indian market sentiments.
+        Respond with a JSON object whose keys are the asset IDs from the ### headings and whose values are the complete Markdown report for that asset.
+        """
+            try:
+                groq_client = self._get_groq_client()
+                response = await groq_client.chat.completions.create(
+                    model=ANALYSIS_MODEL,
+                    messages=[
+                        {"role": "system", "content": ASSET_SYSTEM_PROMPT},
+                        {"role": "user", "content": user_prompt}
+                    ],
+                    max_tokens=ASSET_MAX_TOKENS * len(pending),
+                    response_format={"type": "json_object"}
+                )
+                reports = (orjson or json).loads(response.choices[0].message.content)
+                for item in pending:
+                    report = reports.get(item["key"])
+                    if isinstance(report, str) and report.strip():
+                        analyses[item["key"]] = report
+            except Exception as e:
+                print(f"Batched analysis failed, falling back to single requests: {e}")
+
+        missing = [item for item in pending if item["key"] not in analyses]
+        if missing:
+            reports = await asyncio.gather(*(
+                self._generate_report(item["name"], item["type"], item["details"], contexts[item["key"]])
+                for item in missing
+            ))
+            analyses.update(zip((item["key"] for item in missing), reports))
+
+        return analyses
+
     async def analyze_portfolio(self, portfolio_summary: str) -> str:
         """
         Generates an overall portfolio analysis based on the aggregated data.
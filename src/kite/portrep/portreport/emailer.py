@@ -1,12 +1,16 @@
 # emailer.py
 import os
+import re
+import base64
+import secrets
 from email.message import EmailMessage
+from email import policy
 import email.utils
 import smtplib
 import markdown
 from xhtml2pdf import pisa
 
-from .mail_config import SMTP_HOST, SMTP_PORT, SMTP_USER, SMTP_PASS, MAIL_FROM
+from .mail_config import SMTP_HOST, SMTP_PORT, SMTP_USER, SMTP_PASS, MAIL_FROM, SMTP_TIMEOUT
 
 
 def convert_md_to_pdf(md_content: str, output_path: str):
@@ -40,7 +44,92 @@ def convert_md_to_pdf(md_content: str, output_path: str):
     print(f"✅ PDF Report generated: {output_path}")
 
 
-def send_email_with_attachment(to_addr: str, subject: str, body: str, attachment_path: str):
+# 57-byte multiples base64-encode to whole 76-char lines (~64 KB read per chunk)
+ATTACHMENT_CHUNK = 57 * 1150
+
+# SMTP transparency (RFC 5321 4.5.2): a leading "." on any line is doubled
+_LEADING_DOT = re.compile(rb"(?m)^\.")
+
+
+def _dot_stuff(data: bytes) -> bytes:
+    return _LEADING_DOT.sub(b"..", data)
+
+
+def _stream_message(s: smtplib.SMTP, to_addr: str, headers: EmailMessage, body: str, attachment_path: str):
+    """
+    Send a multipart message over DATA, base64-encoding the attachment chunk by chunk from disk.
+    Returns the refused recipients like sendmail does (raises if all were refused).
+    """
+    boundary = f"==={secrets.token_hex(16)}=="
+    headers["MIME-Version"] = "1.0"
+    headers["Content-Type"] = f'multipart/mixed; boundary="{boundary}"'
+
+    text_part = EmailMessage(policy=policy.SMTP)
+    text_part.set_content(body)
+    filename = os.path.basename(attachment_path)
+    sep = f"--{boundary}\r\n".encode()
+
+    # Same recipient handling as send_message: "a@x.com, B <b@y.com>" -> bare addresses
+    recipients = [addr for _, addr in email.utils.getaddresses([to_addr]) if addr]
+    if not recipients:
+        raise ValueError(f"No valid recipient address in {to_addr!r}")
+
+    # Everything that can fail locally (header folding, reading the PDF) happens
+    # before MAIL FROM, so a local error never lands in the middle of DATA.
+    # Headers and text part are dot-stuffed; base64 lines never start with "."
+    preamble = b"".join((
+        _dot_stuff(b"".join(policy.SMTP.fold_binary(k, v) for k, v in headers.items()) + b"\r\n"),
+        sep,
+        _dot_stuff(text_part.as_bytes(policy=policy.SMTP)),
+        b"\r\n" + sep,
+        b"Content-Type: application/pdf\r\n"
+        b"Content-Transfer-Encoding: base64\r\n",
+        f'Content-Disposition: attachment; filename="{filename}"\r\n\r\n'.encode(),
+    ))
+
+    with open(attachment_path, "rb") as f:
+        s.ehlo_or_helo_if_needed()
+        in_data = False
+        try:
+            code, resp = s.mail(MAIL_FROM)
+            if code != 250:
+                raise smtplib.SMTPSenderRefused(code, resp, MAIL_FROM)
+            refused = {}
+            for rcpt in recipients:
+                code, resp = s.rcpt(rcpt)
+                if code not in (250, 251):
+                    refused[rcpt] = (code, resp)
+            if len(refused) == len(recipients):
+                raise smtplib.SMTPRecipientsRefused(refused)
+            code, resp = s.docmd("data")
+            if code != 354:
+                raise smtplib.SMTPDataError(code, resp)
+
+            in_data = True
+            s.send(preamble)
+            while chunk := f.read(ATTACHMENT_CHUNK):
+                s.send(base64.encodebytes(chunk).replace(b"\n", b"\r\n"))
+            s.send(f"--{boundary}--\r\n.\r\n".encode())
+            in_data = False
+
+            code, resp = s.getreply()
+            if code != 250:
+                raise smtplib.SMTPDataError(code, resp)
+        except Exception:
+            if in_data:
+                # Mid-DATA, anything we send is message body: drop the connection instead
+                s.close()
+            else:
+                # Don't leave the transaction half-open (best effort: the link may be gone)
+                try:
+                    s.rset()
+                except OSError:  # SMTPException and socket errors
+                    pass
+            raise
+    return refused
+
+
+def send_email_with_attachment(to_addr: str, subject: str, body: str, attachment_path: str, use_streaming: bool = False):
     if not to_addr:
         raise ValueError("No recipient email address")
 
@@ -49,15 +138,20 @@ def send_email_with_attachment(to_addr: str, subject: str, body: str, attachment
     msg["From"] = MAIL_FROM
     msg["Subject"] = subject
     msg["Date"] = email.utils.formatdate(localtime=True)
-    msg.set_content(body)
 
-    with open(attachment_path, "rb") as f:
-        data = f.read()
-    msg.add_attachment(data, maintype="application", subtype="pdf", filename=os.path.basename(attachment_path))
+    if not use_streaming:
+        msg.set_content(body)
+        with open(attachment_path, "rb") as f:
+            data = f.read()
+        msg.add_attachment(data, maintype="application", subtype="pdf", filename=os.path.basename(attachment_path))
 
     # SSL (465) is simplest for Gmail
-    with smtplib.SMTP_SSL(host=SMTP_HOST, port=SMTP_PORT) as s:
+    with smtplib.SMTP_SSL(host=SMTP_HOST, port=SMTP_PORT, timeout=SMTP_TIMEOUT) as s:
         if SMTP_USER and SMTP_PASS:
             s.login(SMTP_USER, SMTP_PASS)
-        s.send_message(msg)
+        if use_streaming:
+            # Never holds the PDF or its base64 copy in memory
+            _stream_message(s, to_addr, msg, body, attachment_path)
+        else:
+            s.send_message(msg)
     print(f"✅ Email sent successfully to {to_addr}")
@@ -1,14 +1,23 @@
 import json
 import asyncio
+import functools
+import re
 from datetime import datetime
 from pathlib import Path
 import os
 import base64
+import jinja2
 import markdown
 from dotenv import load_dotenv
 
 from src.kite.portrep.portreport.deepagent import DeepAgent
 from src.kite.portrep.portreport.emailer import send_email_with_attachment
+from src.utils.llm_balancer import balancer
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 load_dotenv(override=True)
 
@@ -24,6 +33,15 @@ REPORT_FILE = DATA_DIR / "portfolio_report.html"
 MD_REPORT_FILE = DATA_DIR / "portfolio_report.md"
 CHARTS_DIR = SCRIPT_DIR / "viz" / "charts"
 
+# Max stock pages rendered at once (chart base64 reads + markdown conversion)
+STOCK_PAGE_CONCURRENCY = 8
+
+# Concurrent asset analyses allowed per Groq key (each analysis is one search + one LLM call)
+ANALYSES_PER_KEY = int(os.getenv("ANALYSES_PER_KEY", "4"))
+
+# Assets written up per LLM request; searches within a batch still run in parallel
+ANALYSIS_BATCH_SIZE = max(1, int(os.getenv("ANALYSIS_BATCH_SIZE", "5")))
+
 
 def get_image_base64(image_path):
     """Convert image file to base64 data URI for HTML embedding"""
@@ -40,16 +58,38 @@ def get_image_base64(image_path):
 
 def format_currency(val):
     """Format value as Indian Rupee currency"""
+    # Fast path: holdings/MF values are already numeric
+    if isinstance(val, (int, float)):
+        return f"₹{val:,.2f}"
     try:
         return f"₹{float(val):,.2f}"
     except Exception:
         return str(val)
 
 
+def analysis_concurrency(item_count):
+    """Parallel asset analyses: ANALYSIS_CONCURRENCY if set, else scaled by available Groq keys"""
+    limit = os.getenv("ANALYSIS_CONCURRENCY")
+    if limit:
+        limit = int(limit)
+    else:
+        limit = max(1, balancer.key_count) * ANALYSES_PER_KEY
+    return max(1, min(limit, item_count))
+
+
+def _write_text(path, *chunks):
+    """Write text chunks to a UTF-8 file in order"""
+    with open(path, "w", encoding="utf-8") as f:
+        for chunk in chunks:
+            f.write(chunk)
+
+
 def load_data():
     if not JSON_FILE.exists():
         print(f"❌ Error: {JSON_FILE} not found.")
         return None
+    if orjson is not None:
+        return orjson.loads(JSON_FILE.read_bytes())
     with open(JSON_FILE, "r", encoding="utf-8") as f:
         return json.load(f)
 
@@ -87,30 +127,38 @@ def format_analysis_content(analysis_text, is_mf=False):
 # format_mf_analysis removed as format_analysis_content handles all cases via markdown now.
 
 
+KEYWORD_CLASSES = {
+    'Buy': 'buy-tag',
+    'Sell': 'sell-tag',
+    'Hold': 'hold-tag',
+    'Accumulate': 'accumulate-tag',
+    'profitable': 'positive-keyword',
+    'growth': 'positive-keyword',
+    'upside': 'positive-keyword',
+    'bullish': 'positive-keyword',
+    'positive': 'positive-keyword',
+    'risk': 'negative-keyword',
+    'challenge': 'negative-keyword',
+    'loss': 'negative-keyword',
+    'decline': 'negative-keyword',
+    'bearish': 'negative-keyword'
+}
+
+# One alternation over all keywords (longest first) so the text is scanned once
+# and already-inserted <span> markup is never re-matched by a later keyword.
+_KEYWORD_RE = re.compile(
+    "|".join(re.escape(k) for k in sorted(KEYWORD_CLASSES, key=len, reverse=True))
+)
+
+
+def _keyword_span(match):
+    keyword = match.group(0)
+    return f'<span class="{KEYWORD_CLASSES[keyword]}">{keyword}</span>'
+
+
 def highlight_keywords(text):
     """Highlight important financial keywords in text"""
-    keywords = {
-        'Buy': 'buy-tag',
-        'Sell': 'sell-tag',
-        'Hold': 'hold-tag',
-        'Accumulate': 'accumulate-tag',
-        'profitable': 'positive-keyword',
-        'growth': 'positive-keyword',
-        'upside': 'positive-keyword',
-        'bullish': 'positive-keyword',
-        'positive': 'positive-keyword',
-        'risk': 'negative-keyword',
-        'challenge': 'negative-keyword',
-        'loss': 'negative-keyword',
-        'decline': 'negative-keyword',
-        'bearish': 'negative-keyword'
-    }
-    
-    for keyword, css_class in keywords.items():
-        if keyword in text:
-            text = text.replace(keyword, f'<span class="{css_class}">{keyword}</span>')
-    
-    return text
+    return _KEYWORD_RE.sub(_keyword_span, text)
 
 
 def get_html_template():
@@ -482,6 +530,13 @@ def get_html_template():
 """
 
 
+@functools.lru_cache(maxsize=1)
+def _template_parts():
+    """Split the HTML template around {CONTENT} once and reuse the pieces"""
+    head, tail = get_html_template().split("{CONTENT}", 1)
+    return head, tail
+
+
 def generate_markdown_content(data, analyses):
     """Generate professional Markdown version of the report"""
     profile = data.get("profile", {})
@@ -494,54 +549,155 @@ def generate_markdown_content(data, analyses):
     total_pnl = sum(h["pnl"] for h in holdings)
     pnl_pct = (total_pnl / total_investment * 100) if total_investment > 0 else 0
 
-    md = f"# Investment Portfolio Analysis Report\n"
-    md += f"Generated on: {timestamp}\n\n"
+    parts: list[str] = ["# Investment Portfolio Analysis Report\n"]
+    append = parts.append
+    append(f"Generated on: {timestamp}\n\n")
 
-    md += "## 1. Client Profile\n"
-    md += f"- **Name:** {profile.get('name', 'N/A')}\n"
-    md += f"- **Client ID:** {profile.get('user_id', 'N/A')}\n"
-    md += f"- **Broker:** {profile.get('broker', 'N/A')}\n"
-    md += f"- **Email:** {profile.get('email', 'N/A')}\n\n"
+    append("## 1. Client Profile\n")
+    append(f"- **Name:** {profile.get('name', 'N/A')}\n")
+    append(f"- **Client ID:** {profile.get('user_id', 'N/A')}\n")
+    append(f"- **Broker:** {profile.get('broker', 'N/A')}\n")
+    append(f"- **Email:** {profile.get('email', 'N/A')}\n\n")
 
-    md += "## 2. Portfolio Summary\n"
-    md += f"- **Total Investment:** {format_currency(total_investment)}\n"
-    md += f"- **Current Value:** {format_currency(current_value)}\n"
-    md += f"- **Total P&L:** {format_currency(total_pnl)} ({pnl_pct:+.2f}%)\n\n"
+    append("## 2. Portfolio Summary\n")
+    append(f"- **Total Investment:** {format_currency(total_investment)}\n")
+    append(f"- **Current Value:** {format_currency(current_value)}\n")
+    append(f"- **Total P&L:** {format_currency(total_pnl)} ({pnl_pct:+.2f}%)\n\n")
 
-    md += "### Holdings\n"
-    md += "| Symbol | Qty | Avg Cost | LTP | P&L |\n"
-    md += "| :--- | :--- | :--- | :--- | :--- |\n"
+    append("### Holdings\n")
+    append("| Symbol | Qty | Avg Cost | LTP | P&L |\n")
+    append("| :--- | :--- | :--- | :--- | :--- |\n")
     for h in holdings:
-        md += f"| {h['symbol']} | {h['qty']} | {format_currency(h['avg'])} | {format_currency(h['ltp'])} | {format_currency(h['pnl'])} |\n"
+        append(f"| {h['symbol']} | {h['qty']} | {format_currency(h['avg'])} | {format_currency(h['ltp'])} | {format_currency(h['pnl'])} |\n")
     
-    md += "\n## 3. Detailed Analysis\n"
+    append("\n## 3. Detailed Analysis\n")
     for h in holdings:
         sym = h['symbol']
         analysis = analyses.get(f"STOCK_{sym}", "Analysis unavailable")
-        md += f"\n### {sym}\n"
-        md += f"{analysis}\n"
-        md += "\n---\n"
+        append(f"\n### {sym}\n")
+        append(f"{analysis}\n")
+        append("\n---\n")
 
     if mfs:
-        md += "\n## 4. Mutual Funds\n"
+        append("\n## 4. Mutual Funds\n")
         for m in mfs:
             scheme = m['scheme_name']
             analysis = analyses.get(f"MF_{scheme}", "Analysis unavailable")
-            md += f"\n### {scheme}\n"
-            md += f"- **Units:** {m['units']}\n"
-            md += f"- **Current Value:** {format_currency(m['value'])}\n"
-            md += f"- **Gain:** {m['gain_pct']}%\n\n"
-            md += f"{analysis}\n"
-            md += "\n---\n"
+            append(f"\n### {scheme}\n")
+            append(f"- **Units:** {m['units']}\n")
+            append(f"- **Current Value:** {format_currency(m['value'])}\n")
+            append(f"- **Gain:** {m['gain_pct']}%\n\n")
+            append(f"{analysis}\n")
+            append("\n---\n")
+
+    return ''.join(parts)
+
+
+# Constant page fragments shared by every report section
+_PAGE_OPEN = '<div class="page">'
+_PAGE_CLOSE = '</div>'
+
+# Per-row and footer fragments are Jinja2 templates compiled once per process;
+# the bytecode cache lets later processes skip compilation as well.
+TEMPLATES_DIR = SCRIPT_DIR / "templates"
+_JINJA_ENV = jinja2.Environment(
+    loader=jinja2.FileSystemLoader(str(TEMPLATES_DIR)),
+    auto_reload=False,
+    cache_size=-1,
+    bytecode_cache=jinja2.FileSystemBytecodeCache(),
+    keep_trailing_newline=True,
+)
+_JINJA_ENV.filters["currency"] = format_currency
+
+
+@functools.lru_cache(maxsize=None)
+def _footer_html():
+    """The disclaimer page never changes, so render it once"""
+    return _JINJA_ENV.get_template("footer.html").render()
 
-    return md
+
+def _render_stock_page(idx, h, analysis):
+    """Render the chart page and analysis page for a single equity holding"""
+    sym = h["symbol"]
+    parts: list[str] = []
+    append = parts.append
+    
+    # PAGE: Stock Chart
+    append(_PAGE_OPEN)
+    append(f'''
+    <div class="section">
+        <div class="section-title">
+            <span class="number">4.{idx + 1}</span>
+            {sym} - Technical Chart Analysis
+        </div>
+        
+        <div class="stock-card">
+            <div class="stock-header">
+                <div class="stock-name">{sym}</div>
+            </div>
+            
+            <div class="stock-metrics">
+                <div class="metric">
+                    <div class="metric-label">Position</div>
+                    <div class="metric-value">{h['qty']} shares</div>
+                </div>
+                <div class="metric">
+                    <div class="metric-label">Avg. Cost</div>
+                    <div class="metric-value">{format_currency(h['avg'])}</div>
+                </div>
+                <div class="metric">
+                    <div class="metric-label">Current Price</div>
+                    <div class="metric-value">{format_currency(h['ltp'])}</div>
+                </div>
+                <div class="metric">
+                    <div class="metric-label">Net P&L</div>
+                    <div class="metric-value {'positive-value' if h['pnl'] >= 0 else 'negative-value'}">{format_currency(h['pnl'])}</div>
+                </div>
+            </div>
+    ''')
+    
+    stock_chart = CHARTS_DIR / f"stock_analysis_{sym}.png"
+    if stock_chart.exists():
+        img_base64 = get_image_base64(stock_chart)
+        if img_base64:
+            append(f'''
+            <div class="chart-container">
+                <img src="{img_base64}" alt="{sym} Technical Analysis">
+            </div>
+            ''')
+    else:
+        append('<p style="color: #64748b; text-align: center; padding: 40px;">Chart not available</p>')
+    
+    append('''
+        </div>
+    </div>
+    ''')
+    append(_PAGE_CLOSE)  # Close chart page
+    
+    # PAGE: Stock Analysis Text
+    append(_PAGE_OPEN)
+    append(f'''
+    <div class="section">
+        <div class="section-title">
+            <span class="number">4.{idx + 1}</span>
+            {sym} - Research & Analysis
+        </div>
+        
+        <div class="stock-card">
+            <div class="subsection-title">Comprehensive Investment Analysis</div>
+            {format_analysis_content(analysis, is_mf=False)}
+        </div>
+    </div>
+    ''')
+    append(_PAGE_CLOSE)  # Close analysis page
+    
+    return ''.join(parts)
 
 
-def generate_html_content(data, analyses):
-    """Generate HTML content with professional styling and proper page breaks"""
+def _render_overview(data):
+    """Render the profile, market sentiment and portfolio overview pages (no analyses needed)"""
     profile = data.get("profile", {})
     holdings = data.get("holdings", [])
-    mfs = data.get("mutual_funds", [])
     timestamp = data.get("timestamp", datetime.now().strftime("%B %d, %Y at %I:%M %p"))
 
     # Calculate totals
@@ -550,19 +706,20 @@ def generate_html_content(data, analyses):
     total_pnl = sum(h["pnl"] for h in holdings)
     pnl_pct = (total_pnl / total_investment * 100) if total_investment > 0 else 0
 
-    html = ''
+    parts: list[str] = []
+    append = parts.append
     
     # ==================== PAGE 1: Header & Profile ====================
-    html += '<div class="page">'
+    append(_PAGE_OPEN)
     
-    html += f'''
+    append(f'''
     <div class="header">
         <h1>Investment Portfolio Analysis Report</h1>
         <div class="subtitle">Generated on {timestamp}</div>
     </div>
-    '''
+    ''')
     
-    html += '''
+    append('''
     <div class="section">
         <div class="section-title">
             <span class="number">1</span>
@@ -570,9 +727,9 @@ def generate_html_content(data, analyses):
         </div>
         <div class="profile-card">
             <div class="profile-grid">
-    '''
+    ''')
     
-    html += f'''
+    append(f'''
                 <div class="profile-item">
                     <div class="profile-label">Client Name</div>
                     <div class="profile-value">{profile.get('name', 'N/A')}</div>
@@ -589,35 +746,35 @@ def generate_html_content(data, analyses):
                     <div class="profile-label">Email Contact</div>
                     <div class="profile-value">{profile.get('email', 'N/A')}</div>
                 </div>
-    '''
+    ''')
     
-    html += '''
+    append('''
             </div>
         </div>
     </div>
-    '''
+    ''')
     
     # ==================== PAGE 2: Market Sentiment ====================
-    html += '''
+    append('''
     <div class="section">
         <div class="section-title">
             <span class="number">2</span>
             Market Sentiment Dashboard
         </div>
         <p style="color: #64748b; margin-bottom: 15px;">Current Indian market overview with major indices performance and sentiment analysis.</p>
-    '''
+    ''')
     
     market_chart = CHARTS_DIR / "market_sentiment_dashboard.png"
     if market_chart.exists():
         img_base64 = get_image_base64(market_chart)
         if img_base64:
-            html += f'''
+            append(f'''
             <div class="chart-container">
                 <img src="{img_base64}" alt="Market Sentiment Dashboard">
             </div>
-            '''
+            ''')
     
-    html += '''
+    append('''
         <div class="info-box">
             <p><strong>Top Left - Major Indices Performance:</strong> Shows percentage change for key Indian indices (NIFTY 50, SENSEX, BANKNIFTY, etc.) over the selected period.</p>
             <p><strong>Top Right - NIFTY 50 vs India VIX:</strong> Displays the inverse relationship between market performance and volatility. Higher VIX indicates increased market fear.</p>
@@ -625,16 +782,16 @@ def generate_html_content(data, analyses):
             <p><strong>Bottom Right - Fear & Greed Index:</strong> Market sentiment gauge based on India VIX. Extreme Fear (&lt;25) suggests buying opportunity, Extreme Greed (&gt;75) suggests caution.</p>
         </div>
     </div>
-    '''
+    ''')
     
-    html += '</div>'  # Close PAGE 1
+    append(_PAGE_CLOSE)  # Close PAGE 1
     
     # ==================== PAGE 2: Portfolio Overview ====================
-    html += '<div class="page">'
+    append(_PAGE_OPEN)
     
     pnl_class = 'positive' if total_pnl >= 0 else 'negative'
     
-    html += f'''
+    append(f'''
     <div class="section">
         <div class="section-title">
             <span class="number">3</span>
@@ -658,22 +815,22 @@ def generate_html_content(data, analyses):
                 <div class="stat-change {pnl_class}">{pnl_pct:+.2f}% ROI</div>
             </div>
         </div>
-    '''
+    ''')
     
     portfolio_chart = CHARTS_DIR / "portfolio_performance_tracker.png"
     if portfolio_chart.exists():
         img_base64 = get_image_base64(portfolio_chart)
         if img_base64:
-            html += f'''
+            append(f'''
             <div class="subsection-title">Portfolio Performance Chart</div>
             <p style="color: #64748b; margin-bottom: 12px;">Year-to-date performance tracking of your equity holdings with benchmark comparison.</p>
             <div class="chart-container">
                 <img src="{img_base64}" alt="Portfolio Performance Tracker">
             </div>
-            '''
+            ''')
     
     # Holdings Table
-    html += '''
+    append('''
         <div class="subsection-title">Portfolio Details</div>
         <div class="table-container">
             <table>
@@ -687,270 +844,280 @@ def generate_html_content(data, analyses):
                     </tr>
                 </thead>
                 <tbody>
-    '''
+    ''')
     
+    holding_row = _JINJA_ENV.get_template("holding_row.html")
     for h in holdings:
-        pnl_class = 'positive-value' if h['pnl'] >= 0 else 'negative-value'
-        pnl_pct = (h['pnl'] / (h['qty'] * h['avg']) * 100) if (h['qty'] * h['avg']) > 0 else 0
-        html += f'''
-                    <tr>
-                        <td class="symbol-cell">{h['symbol']}</td>
-                        <td>{h['qty']}</td>
-                        <td>{format_currency(h['avg'])}</td>
-                        <td>{format_currency(h['ltp'])}</td>
-                        <td class="{pnl_class}">{format_currency(h['pnl'])} <br><small>({pnl_pct:+.2f}%)</small></td>
-                    </tr>
-        '''
+        append(holding_row.render(h=h))
     
-    html += '''
+    append('''
                 </tbody>
             </table>
         </div>
     </div>
-    '''
+    ''')
     
-    html += '</div>'  # Close PAGE 2
+    append(_PAGE_CLOSE)  # Close PAGE 2
     
-    # ==================== Individual Stock Analysis - Each stock gets 2 pages ====================
-    for idx, h in enumerate(holdings):
-        sym = h["symbol"]
-        analysis = analyses.get(f"STOCK_{sym}", "Analysis unavailable.")
-        
-        # PAGE: Stock Chart
-        html += '<div class="page">'
-        html += f'''
-        <div class="section">
-            <div class="section-title">
-                <span class="number">4.{idx + 1}</span>
-                {sym} - Technical Chart Analysis
-            </div>
-            
-            <div class="stock-card">
-                <div class="stock-header">
-                    <div class="stock-name">{sym}</div>
-                </div>
-                
-                <div class="stock-metrics">
-                    <div class="metric">
-                        <div class="metric-label">Position</div>
-                        <div class="metric-value">{h['qty']} shares</div>
-                    </div>
-                    <div class="metric">
-                        <div class="metric-label">Avg. Cost</div>
-                        <div class="metric-value">{format_currency(h['avg'])}</div>
-                    </div>
-                    <div class="metric">
-                        <div class="metric-label">Current Price</div>
-                        <div class="metric-value">{format_currency(h['ltp'])}</div>
-                    </div>
-                    <div class="metric">
-                        <div class="metric-label">Net P&L</div>
-                        <div class="metric-value {'positive-value' if h['pnl'] >= 0 else 'negative-value'}">{format_currency(h['pnl'])}</div>
-                    </div>
-                </div>
-        '''
-        
-        stock_chart = CHARTS_DIR / f"stock_analysis_{sym}.png"
-        if stock_chart.exists():
-            img_base64 = get_image_base64(stock_chart)
-            if img_base64:
-                html += f'''
-                <div class="chart-container">
-                    <img src="{img_base64}" alt="{sym} Technical Analysis">
-                </div>
-                '''
-        else:
-            html += '<p style="color: #64748b; text-align: center; padding: 40px;">Chart not available</p>'
-        
-        html += '''
-            </div>
+    return ''.join(parts)
+
+
+def _render_mf_summary(mfs):
+    """Render the mutual fund chart and scheme-wise holdings page"""
+    parts: list[str] = []
+    append = parts.append
+    
+    # PAGE: MF Summary & Chart
+    append(_PAGE_OPEN)
+
+    append('''
+    <div class="section">
+        <div class="section-title">
+            <span class="number">5</span>
+            Mutual Fund Portfolio Analysis
         </div>
-        '''
-        html += '</div>'  # Close chart page
-        
-        # PAGE: Stock Analysis Text
-        html += '<div class="page">'
-        html += f'''
-        <div class="section">
-            <div class="section-title">
-                <span class="number">4.{idx + 1}</span>
-                {sym} - Research & Analysis
-            </div>
-            
-            <div class="stock-card">
-                <div class="subsection-title">Comprehensive Investment Analysis</div>
-                {format_analysis_content(analysis, is_mf=False)}
+    ''')
+
+    mf_chart = CHARTS_DIR / "mf_performance_overview.png"
+    if mf_chart.exists():
+        img_base64 = get_image_base64(mf_chart)
+        if img_base64:
+            append(f'''
+            <div class="subsection-title">Performance Overview</div>
+            <div class="chart-container">
+                <img src="{img_base64}" alt="Mutual Fund Performance Overview">
             </div>
+            ''')
+
+    # MF Summary Table (Scheme-wise Holdings)
+    append('''
+        <div class="subsection-title">Scheme-wise Holdings</div>
+        <div class="table-container">
+            <table>
+                <thead>
+                    <tr>
+                        <th>Scheme Name</th>
+                        <th>Units</th>
+                        <th>NAV</th>
+                        <th>Current Value</th>
+                        <th>Gain %</th>
+                    </tr>
+                </thead>
+                <tbody>
+    ''')
+
+    mf_row = _JINJA_ENV.get_template("mf_row.html")
+    for m in mfs:
+        append(mf_row.render(m=m))
+
+    append('''
+                </tbody>
+            </table>
         </div>
-        '''
-        html += '</div>'  # Close analysis page
+    </div>
+    ''')
+    append(_PAGE_CLOSE)  # Close summary page
     
-    # ==================== Mutual Fund Analysis ====================
-    if mfs:
-        # PAGE: MF Summary & Chart
-        html += '<div class="page">'
-        
-        html += '''
-        <div class="section">
-            <div class="section-title">
-                <span class="number">5</span>
-                Mutual Fund Portfolio Analysis
+    return ''.join(parts)
+
+
+def _render_mf_page(mf_idx, m, analysis):
+    """Render the analysis page for a single mutual fund"""
+    parts: list[str] = []
+    append = parts.append
+    
+    append(_PAGE_OPEN)
+
+    scheme_name = m["scheme_name"]
+    gain_class = 'positive-value' if m['gain_pct'] >= 0 else 'negative-value'
+
+    append(f'''
+    <div class="section">
+        <div class="section-title">
+            <span class="number">5.{mf_idx + 1}</span>
+            {scheme_name}
+        </div>
+
+        <div class="stock-card">
+            <div class="stock-header">
+                <div class="stock-name" style="font-size: 16pt;">{scheme_name}</div>
             </div>
-        '''
-        
-        mf_chart = CHARTS_DIR / "mf_performance_overview.png"
-        if mf_chart.exists():
-            img_base64 = get_image_base64(mf_chart)
-            if img_base64:
-                html += f'''
-                <div class="subsection-title">Performance Overview</div>
-                <div class="chart-container">
-                    <img src="{img_base64}" alt="Mutual Fund Performance Overview">
+
+            <div class="stock-metrics">
+                <div class="metric">
+                    <div class="metric-label">Units</div>
+                    <div class="metric-value">{m['units']:.2f}</div>
                 </div>
-                '''
-        
-        # MF Summary Table (Scheme-wise Holdings)
-        html += '''
-            <div class="subsection-title">Scheme-wise Holdings</div>
-            <div class="table-container">
-                <table>
-                    <thead>
-                        <tr>
-                            <th>Scheme Name</th>
-                            <th>Units</th>
-                            <th>NAV</th>
-                            <th>Current Value</th>
-                            <th>Gain %</th>
-                        </tr>
-                    </thead>
-                    <tbody>
-        '''
-        
-        for m in mfs:
-            gain_class = 'positive-value' if m['gain_pct'] >= 0 else 'negative-value'
-            html += f'''
-                        <tr>
-                            <td class="symbol-cell" style="max-width: 400px; font-weight: 700;">{m['scheme_name']}</td>
-                            <td>{m['units']:.2f}</td>
-                            <td>{format_currency(m['nav'])}</td>
-                            <td>{format_currency(m['value'])}</td>
-                            <td class="{gain_class}" style="font-weight: 700;">{m['gain_pct']:.2f}%</td>
-                        </tr>
-            '''
-            
-        html += '''
-                    </tbody>
-                </table>
-            </div>
-        </div>
-        '''
-        html += '</div>'  # Close summary page
-        
-        # Each MF gets its own page
-        for mf_idx, m in enumerate(mfs):
-            html += '<div class="page">'
-            
-            scheme_name = m["scheme_name"]
-            analysis = analyses.get(f"MF_{scheme_name}", "Analysis unavailable.")
-            gain_class = 'positive-value' if m['gain_pct'] >= 0 else 'negative-value'
-            
-            html += f'''
-            <div class="section">
-                <div class="section-title">
-                    <span class="number">5.{mf_idx + 1}</span>
-                    {scheme_name}
+                <div class="metric">
+                    <div class="metric-label">NAV</div>
+                    <div class="metric-value">{format_currency(m['nav'])}</div>
                 </div>
-                
-                <div class="stock-card">
-                    <div class="stock-header">
-                        <div class="stock-name" style="font-size: 16pt;">{scheme_name}</div>
-                    </div>
-                    
-                    <div class="stock-metrics">
-                        <div class="metric">
-                            <div class="metric-label">Units</div>
-                            <div class="metric-value">{m['units']:.2f}</div>
-                        </div>
-                        <div class="metric">
-                            <div class="metric-label">NAV</div>
-                            <div class="metric-value">{format_currency(m['nav'])}</div>
-                        </div>
-                        <div class="metric">
-                            <div class="metric-label">Market Value</div>
-                            <div class="metric-value">{format_currency(m['value'])}</div>
-                        </div>
-                        <div class="metric">
-                            <div class="metric-label">Gain</div>
-                            <div class="metric-value {gain_class}">{m['gain_pct']:.2f}%</div>
-                        </div>
-                    </div>
-                    
-                    <div class="subsection-title">Fund Analysis</div>
-                    {format_analysis_content(analysis, is_mf=True)}
+                <div class="metric">
+                    <div class="metric-label">Market Value</div>
+                    <div class="metric-value">{format_currency(m['value'])}</div>
+                </div>
+                <div class="metric">
+                    <div class="metric-label">Gain</div>
+                    <div class="metric-value {gain_class}">{m['gain_pct']:.2f}%</div>
                 </div>
             </div>
-            '''
-            html += '</div>'  # Close MF page
-    
-    # ==================== Footer Page ====================
-    html += '<div class="page">'
-    html += '''
-    <div class="footer">
-        <p><strong>Disclaimer</strong></p>
-        <p>This report is generated automatically and is for informational purposes only.</p>
-        <p>Past performance does not guarantee future results. Please consult with a financial advisor before making investment decisions.</p>
-        <p>All data is sourced from authorized brokers and market data providers.</p>
+
+            <div class="subsection-title">Fund Analysis</div>
+            {format_analysis_content(analysis, is_mf=True)}
+        </div>
     </div>
-    '''
-    html += '</div>'
+    ''')
+    append(_PAGE_CLOSE)  # Close MF page
     
-    return html
+    return ''.join(parts)
 
 
-def convert_html_to_pdf(html_content, pdf_path):
-    """Convert HTML to PDF using multiple methods"""
-    
-    # Method 1: Try xhtml2pdf (simplest, no external dependencies)
-    try:
-        from xhtml2pdf import pisa
-        
+def _compose_html(overview, stock_pages, mfs, mf_pages):
+    """Join the rendered sections in report order"""
+    parts = [overview, *stock_pages]
+    if mfs:
+        parts.append(_render_mf_summary(mfs))
+        parts.extend(mf_pages)
+    # ==================== Footer Page ====================
+    parts.append(_footer_html())
+    return ''.join(parts)
+
+
+async def generate_html_streaming(data, analysis_batches):
+    """
+    Render report pages while analyses are still arriving.
+    analysis_batches is an async iterator of {key: analysis} dicts; each asset's page is
+    rendered (off the event loop) as soon as its analysis lands. Returns (html, analyses).
+    """
+    holdings = data.get("holdings", [])
+    mfs = data.get("mutual_funds", [])
+
+    # Pages in report order, and which of them each analysis key feeds
+    renderers = [functools.partial(_render_stock_page, idx, h) for idx, h in enumerate(holdings)]
+    renderers += [functools.partial(_render_mf_page, idx, m) for idx, m in enumerate(mfs)]
+    keys = [f"STOCK_{h['symbol']}" for h in holdings] + [f"MF_{m['scheme_name']}" for m in mfs]
+    pages_by_key: dict[str, list[int]] = {}
+    for pos, key in enumerate(keys):
+        pages_by_key.setdefault(key, []).append(pos)
+
+    semaphore = asyncio.Semaphore(STOCK_PAGE_CONCURRENCY)
+
+    async def render_page_safe(render, analysis):
+        async with semaphore:
+            return await asyncio.to_thread(render, analysis)
+
+    overview_task = asyncio.create_task(asyncio.to_thread(_render_overview, data))
+    page_tasks: list = [None] * len(renderers)
+    analyses = {}
+
+    def schedule(key, analysis):
+        for pos in pages_by_key.get(key, ()):
+            if page_tasks[pos] is None:
+                page_tasks[pos] = asyncio.create_task(render_page_safe(renderers[pos], analysis))
+
+    async for batch in analysis_batches:
+        analyses.update(batch)
+        for key, analysis in batch.items():
+            schedule(key, analysis)
+
+    # Anything that never got an analysis still gets its page
+    for key in pages_by_key:
+        schedule(key, "Analysis unavailable.")
+
+    overview = await overview_task
+    pages = await asyncio.gather(*page_tasks)
+    return _compose_html(overview, pages[:len(holdings)], mfs, pages[len(holdings):]), analyses
+
+
+def _probe_xhtml2pdf():
+    from xhtml2pdf import pisa
+
+    def write(html_content, pdf_path):
         with open(pdf_path, "w+b") as pdf_file:
             pisa_status = pisa.CreatePDF(html_content, dest=pdf_file)
-            
-        if not pisa_status.err:
-            print(f"✅ PDF generated successfully: {pdf_path}")
-            return True
-    except ImportError:
-        print("⚠️ xhtml2pdf not installed. Trying next method...")
-    except Exception as e:
-        print(f"⚠️ xhtml2pdf failed: {e}")
-    
-    # Method 2: Try weasyprint
-    try:
-        from weasyprint import HTML, CSS
-        HTML(string=html_content).write_pdf(pdf_path)
-        print(f"✅ PDF generated successfully: {pdf_path}")
+        return not pisa_status.err
+
+    return write
+
+
+def _probe_weasyprint():
+    import weasyprint
+
+    font_config = None
+
+    def write(html_content, pdf_path):
+        nonlocal font_config
+        if font_config is None:
+            # Moved from weasyprint.fonts to weasyprint.text.fonts in v53
+            try:
+                from weasyprint.text.fonts import FontConfiguration
+            except ImportError:
+                from weasyprint.fonts import FontConfiguration
+            # Font discovery is a large part of weasyprint's per-run cost; do it once
+            font_config = FontConfiguration()
+        weasyprint.HTML(string=html_content).write_pdf(pdf_path, font_config=font_config)
         return True
-    except ImportError:
-        print("⚠️ weasyprint not installed. Trying next method...")
-    except Exception as e:
-        print(f"⚠️ weasyprint failed: {e}")
-    
-    # Method 3: Try pdfkit
-    try:
-        import pdfkit
-        options = {
-            'encoding': 'UTF-8',
-            'enable-local-file-access': None,
-            'quiet': ''
-        }
+
+    return write
+
+
+def _probe_pdfkit():
+    import pdfkit
+    options = {
+        'encoding': 'UTF-8',
+        'enable-local-file-access': None,
+        'quiet': ''
+    }
+
+    def write(html_content, pdf_path):
         pdfkit.from_string(html_content, pdf_path, options=options)
-        print(f"✅ PDF generated successfully: {pdf_path}")
         return True
+
+    return write
+
+
+# Preference order: xhtml2pdf (no external deps), weasyprint (best quality),
+# pdfkit (requires wkhtmltopdf)
+_PDF_PROBES = (
+    ("xhtml2pdf", _probe_xhtml2pdf),
+    ("weasyprint", _probe_weasyprint),
+    ("pdfkit", _probe_pdfkit),
+)
+
+
+@functools.lru_cache(maxsize=None)
+def _pdf_backend(name, probe):
+    """Import a PDF backend once; returns its writer, or None if unavailable"""
+    try:
+        return probe()
     except ImportError:
-        print("⚠️ pdfkit not installed.")
+        print(f"⚠️ {name} not installed. Trying next method...")
     except Exception as e:
-        print(f"⚠️ pdfkit failed: {e}")
+        print(f"⚠️ {name} unavailable: {e}")
+    return None
+
+
+def preload_pdf_backend():
+    """Resolve the first usable PDF backend ahead of time; returns its name, or None"""
+    for name, probe in _PDF_PROBES:
+        if _pdf_backend(name, probe) is not None:
+            return name
+    return None
+
+
+def convert_html_to_pdf(html_content, pdf_path):
+    """Convert HTML to PDF using the first installed backend that succeeds"""
+    
+    for name, probe in _PDF_PROBES:
+        write = _pdf_backend(name, probe)
+        if write is None:
+            continue
+        try:
+            if write(html_content, pdf_path):
+                print(f"✅ PDF generated successfully: {pdf_path}")
+                return True
+        except Exception as e:
+            print(f"⚠️ {name} failed: {e}")
     
     # All methods failed
     print("\n" + "="*60)
@@ -982,73 +1149,82 @@ async def main_async(send_email: bool = True):
         return None
 
     agent = DeepAgent()
-    analyses = {}
-
-    # Parallel Processing Configuration
-    CONCURRENCY_LIMIT = 5
-    semaphore = asyncio.Semaphore(CONCURRENCY_LIMIT)
-
-    async def analyze_item_safe(key, name, type_label, details):
-        """Analyze a single item with semaphore protection"""
-        async with semaphore:
-            print(f"   - Analyzing {name}...")
-            try:
-                result = await agent.analyze_asset(name, type_label, details)
-                return key, result
-            except Exception as e:
-                print(f"     ❌ Failed {name}: {e}")
-                return key, f"Error analyzing {name}: {str(e)}"
 
-    # 1. Prepare Stock Tasks
-    print(f"\n📦 Analyzing Equity Holdings (Parallel x{CONCURRENCY_LIMIT})...")
-    stock_tasks = []
+    # 1. Prepare Stock Items
+    items = []
     for h in data.get("holdings", []):
         sym = h["symbol"]
         details = (
             f"Quantity: {h['qty']}, Average Price: ₹{h['avg']}, "
             f"Current Price: ₹{h['ltp']}, Total P&L: ₹{h['pnl']}"
         )
-        stock_tasks.append(analyze_item_safe(f"STOCK_{sym}", sym, "Stock", details))
+        items.append({"key": f"STOCK_{sym}", "name": sym, "type": "Stock", "details": details})
 
-    # 2. Prepare MF Tasks
-    print(f"\n🏦 Analyzing Mutual Funds (Parallel x{CONCURRENCY_LIMIT})...")
-    mf_tasks = []
+    # 2. Prepare MF Items
     for m in data.get("mutual_funds", []):
         scheme_name = m["scheme_name"]
         details = (
             f"Units: {m['units']}, NAV: ₹{m['nav']}, "
             f"Current Value: ₹{m['value']}, Gain: {m['gain_pct']}%"
         )
-        mf_tasks.append(analyze_item_safe(f"MF_{scheme_name}", scheme_name, "Mutual Fund", details))
+        items.append({"key": f"MF_{scheme_name}", "name": scheme_name, "type": "Mutual Fund", "details": details})
 
-    # 3. Execute All Tasks concurrently
-    all_tasks = stock_tasks + mf_tasks
-    if all_tasks:
-        results = await asyncio.gather(*all_tasks)
-        analyses = dict(results)
+    # Parallel Processing Configuration: one LLM request per batch of assets
+    batches = [items[i:i + ANALYSIS_BATCH_SIZE] for i in range(0, len(items), ANALYSIS_BATCH_SIZE)]
+    CONCURRENCY_LIMIT = analysis_concurrency(len(batches))
+    semaphore = asyncio.Semaphore(CONCURRENCY_LIMIT)
+
+    async def analyze_batch_safe(batch):
+        """Analyze a batch of items with semaphore protection"""
+        async with semaphore:
+            print(f"   - Analyzing {', '.join(item['name'] for item in batch)}...")
+            try:
+                return await agent.analyze_assets_batch(batch)
+            except Exception as e:
+                print(f"     ❌ Failed batch: {e}")
+                return {item["key"]: f"Error analyzing {item['name']}: {str(e)}" for item in batch}
+
+    # 3. Execute All Batches concurrently
+    async def completed_batches():
+        """Yield each batch's analyses as it lands rather than waiting on the slowest batch"""
+        done_count = 0
+        for done in asyncio.as_completed([analyze_batch_safe(b) for b in batches]):
+            batch_result = await done
+            done_count += len(batch_result)
+            print(f"     ✅ Completed {done_count}/{len(items)}")
+            yield batch_result
+
+    if batches:
+        print(f"\n📦 Analyzing {len(items)} Holdings & Mutual Funds "
+              f"({len(batches)} batches of ≤{ANALYSIS_BATCH_SIZE}, Parallel x{CONCURRENCY_LIMIT})...")
     else:
         print("   ⚠️ No items to analyze.")
 
-    # Generate HTML Report
+    # Generate HTML Report: pages render as their analyses complete
     print("\n📝 Compiling Professional Report...")
-    html_content = generate_html_content(data, analyses)
-    full_html = get_html_template().replace("{CONTENT}", html_content)
-
-    # Save HTML Report
-    with open(REPORT_FILE, "w", encoding="utf-8") as f:
-        f.write(full_html)
+    html_content, analyses = await generate_html_streaming(data, completed_batches())
+    head, tail = _template_parts()
 
-    # Save Markdown Report
     md_content = generate_markdown_content(data, analyses)
-    with open(MD_REPORT_FILE, "w", encoding="utf-8") as f:
-        f.write(md_content)
+
+    full_html = "".join((head, html_content, tail))
+    pdf_file = os.getenv("PORTFOLIO_REPORT_PDF_PATH", str(REPORT_FILE).replace(".html", ".pdf"))
+
+    # Write the HTML and Markdown reports and render the PDF as one concurrent
+    # batch. The HTML file is written from the template pieces; the PDF renderer
+    # needs one string, so it gets the joined full_html (also the return value).
+    # None of the three waits on another, and the CPU-heavy PDF step stays off
+    # the event loop.
+    _, _, pdf_ok = await asyncio.gather(
+        asyncio.to_thread(_write_text, REPORT_FILE, head, html_content, tail),
+        asyncio.to_thread(_write_text, MD_REPORT_FILE, md_content),
+        asyncio.to_thread(convert_html_to_pdf, full_html, pdf_file),
+    )
 
     print(f"\n✅ HTML Report generated: {REPORT_FILE}")
     print(f"✅ Markdown Report generated: {MD_REPORT_FILE}")
 
-    # Convert to PDF
-    pdf_file = os.getenv("PORTFOLIO_REPORT_PDF_PATH", str(REPORT_FILE).replace(".html", ".pdf"))
-    if not convert_html_to_pdf(full_html, pdf_file):
+    if not pdf_ok:
         print("   ⚠️ PDF conversion failed. HTML report available.")
         pdf_file = None
 
@@ -1093,6 +1269,7 @@ Project KiteInfi Mastery Team
                     subject=subject,
                     body=body,
                     attachment_path=pdf_file,
+                    use_streaming=True,
                 )
             else:
                 msg = f"No valid email address found (Resolved: {user_email}). Could not send report."
@@ -14,6 +14,7 @@ SMTP_PORT = int(os.getenv("SMTP_PORT", "465"))  # 465 SSL by default
 SMTP_USER = os.getenv("SMTP_USER", "").strip()
 SMTP_PASS = os.getenv("SMTP_PASS", "").strip()
 MAIL_FROM = os.getenv("MAIL_FROM", SMTP_USER or "noreply@example.com")
+SMTP_TIMEOUT = float(os.getenv("SMTP_TIMEOUT", "60"))  # seconds per socket operation
 FALLBACK_EMAIL = os.getenv("FALLBACK_EMAIL", "")
 
 # Output dir for generated PDFs
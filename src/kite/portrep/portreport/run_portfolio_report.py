@@ -12,6 +12,29 @@ sys.path.insert(0, str(PROJECT_ROOT))
 from src.kite.portrep.portreport.viz.generate_charts import PortfolioChartGenerator
 
 
+def _preload():
+    """Import the report pipeline and pin the PDF backend so the first run doesn't pay for it."""
+    from src.kite.portrep.portreport import filter_mcp_data  # noqa: F401
+    from src.kite.portrep.portreport.generate_report import _template_parts, preload_pdf_backend
+
+    _template_parts()
+    backend = preload_pdf_backend()
+    print(f"📦 Report pipeline preloaded (PDF backend: {backend or 'none'})")
+
+
+async def warmup():
+    """Server-mode warmup: preload the pipeline and build the shared LLM clients."""
+    await asyncio.to_thread(_preload)
+
+    from src.sharebot.agent.tavily_agent import get_llm
+    from src.utils.llm_balancer import balancer
+
+    # Fill the ChatGroq cache for every token budget the classifier and rewriter use
+    for max_tokens in (150, 512, 1024, 2048, 3072, 4096):
+        for _ in range(max(1, balancer.key_count)):
+            get_llm(max_tokens=max_tokens)
+
+
 async def fetch_portfolio_data(master_agent=None):
     """Step 1: Login to Kite and fetch portfolio data."""
     print("\n" + "="*60)
@@ -127,6 +150,13 @@ async def main(master_agent=None, send_email: bool = True):
 
 
 if __name__ == "__main__":
+    try:
+        import uvloop
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    except ImportError:
+        pass
+
+    _preload()
     try:
         asyncio.run(main())
     except KeyboardInterrupt:
@@ -1,15 +1,23 @@
 
+import io
 import os
+import re
+import time
+import functools
 import logging
 import asyncio
+from collections import deque
 from typing import AsyncGenerator, List, Optional
 from pathlib import Path
 from datetime import datetime
 
+from cachetools import TTLCache
 from langchain_groq import ChatGroq
 from langchain_core.messages import HumanMessage, SystemMessage, AIMessage, BaseMessage
 from dotenv import load_dotenv
 
+from src.utils.dates import today_str
+
 # ============================================================================
 # SETUP
 # ============================================================================
@@ -37,29 +45,35 @@ except ImportError:
 
 GROQ_MODEL = os.getenv("GROQ_MODEL", "llama-3.3-70b-versatile")
 SEARCH_TIMEOUT = 30  # seconds
+STREAM_TPS = float(os.getenv("STREAM_TPS", "60"))  # max chunks/sec to the client, 0 = unthrottled
 
 # ============================================================================
 # IN-MEMORY STORAGE (Last 3 turns = 6 messages)
 # ============================================================================
-MEMORY: dict[str, List[BaseMessage]] = {}
+# Sessions are evicted after SESSION_TTL seconds of inactivity or once
+# SESSION_CACHE_SIZE sessions are held (least recently used first).
+MEMORY_TURNS = 6
+MEMORY: TTLCache = TTLCache(
+    maxsize=int(os.getenv("SESSION_CACHE_SIZE", "10000")),
+    ttl=int(os.getenv("SESSION_TTL", "3600"))
+)
 
 def get_memory(session_id: str) -> List[BaseMessage]:
     """Get conversation history (last 6 messages)"""
-    return MEMORY.get(session_id, [])[-6:]
+    return list(MEMORY.get(session_id, ()))
 
 def add_to_memory(session_id: str, user_msg: str, ai_msg: str):
-    """Add turn and auto-prune to 6 messages"""
-    if session_id not in MEMORY:
-        MEMORY[session_id] = []
-    
-    # Prune before adding to maintain exact limit
-    if len(MEMORY[session_id]) >= 6:
-        MEMORY[session_id] = MEMORY[session_id][-4:]
+    """Add turn; the bounded deque drops the oldest turn automatically"""
+    turns = MEMORY.get(session_id)
+    if turns is None:
+        turns = deque(maxlen=MEMORY_TURNS)
     
-    MEMORY[session_id].extend([
+    turns.extend((
         HumanMessage(content=user_msg),
         AIMessage(content=ai_msg)
-    ])
+    ))
+    # Re-assign so the session's TTL is refreshed on every turn
+    MEMORY[session_id] = turns
 
 def clear_memory(session_id: str):
     """Reset session memory"""
@@ -69,45 +83,67 @@ def clear_memory(session_id: str):
 # ============================================================================
 # QUERY INTELLIGENCE
 # ============================================================================
-def classify_query(query: str) -> dict:
-    """
-    Smart query classification for adaptive responses.
-    Returns: {'needs_search': bool, 'type': str, 'max_tokens': int}
-    """
-    q = query.lower().strip()
+_GREETINGS = frozenset({"hi", "hello", "hey", "thanks", "thank you", "bye", "ok", "okay"})
+_FOLLOW_UP_WORDS = frozenset({"why", "how", "elaborate"})
+
+# Keyword groups compiled once into single alternations (substring semantics)
+_GREETING_PREFIX_RE = re.compile("|".join(map(re.escape, _GREETINGS)))
+# The three keyword groups are scanned in one pass: the zero-width lookahead tests
+# every position (so overlapping keywords are never consumed), and group order
+# gives detailed > analysis > price priority when two start at the same spot.
+_KEYWORD_GROUPS_RE = re.compile(
+    r"(?=(?P<detailed>detailed|complete|full analysis|thorough|comprehensive|deep dive|everything|elaborate|ipo|mutual fund)"
+    r"|(?P<analysis>analyze|compare|versus|vs|better|should i|worth|outlook|forecast|recommend)"
+    r"|(?P<price>price|current price|trading at))"
+)
+
+
+@functools.lru_cache(maxsize=1024)
+def _classify(q: str) -> dict:
     words = q.split()
     
     # Greetings & meta (no search needed)
-    greetings = {"hi", "hello", "hey", "thanks", "thank you", "bye", "ok", "okay"}
-    if q in greetings or (len(words) <= 4 and any(q.startswith(g) for g in greetings)):
+    if q in _GREETINGS or (len(words) <= 4 and _GREETING_PREFIX_RE.match(q)):
         return {'needs_search': False, 'type': 'quick', 'max_tokens': 512}
     
     # Single-word follow-ups
-    if len(words) == 1 and words[0] in {"why", "how", "elaborate"}:
+    if len(words) == 1 and words[0] in _FOLLOW_UP_WORDS:
         return {'needs_search': False, 'type': 'medium', 'max_tokens': 1024}
     
-    # Detailed analysis triggers
-    detailed = {"detailed", "complete", "full analysis", "thorough", "comprehensive", 
-                "deep dive", "everything", "elaborate", "ipo", "mutual fund"}
-    if any(kw in q for kw in detailed):
-        return {'needs_search': True, 'type': 'detailed', 'max_tokens': 4096}
+    # One scan for detailed / analysis / price triggers; a detailed hit wins outright
+    seen = set()
+    for match in _KEYWORD_GROUPS_RE.finditer(q):
+        group = match.lastgroup
+        if group == 'detailed':
+            return {'needs_search': True, 'type': 'detailed', 'max_tokens': 4096}
+        seen.add(group)
     
     # Analysis/comparison
-    analysis = {"analyze", "compare", "versus", "vs", "better", "should i", 
-                "worth", "outlook", "forecast", "recommend"}
-    if any(kw in q for kw in analysis):
+    if 'analysis' in seen:
         return {'needs_search': True, 'type': 'detailed', 'max_tokens': 3072}
     
     # Quick price checks
-    if any(kw in q for kw in {"price", "current price", "trading at"}) and len(words) <= 5:
+    if len(words) <= 5 and 'price' in seen:
         return {'needs_search': True, 'type': 'quick', 'max_tokens': 1024}
     
     # Default medium
     return {'needs_search': True, 'type': 'medium', 'max_tokens': 2048}
 
+# Rewrites keyed on (query, recent history); repeats skip the LLM call
+_REWRITE_CACHE: TTLCache = TTLCache(maxsize=256, ttl=600)
+
+def classify_query(query: str) -> dict:
+    """
+    Smart query classification for adaptive responses.
+    Returns: {'needs_search': bool, 'type': str, 'max_tokens': int}
+    """
+    # Copy so callers can't mutate the cached result
+    return dict(_classify(query.lower().strip()))
+
 async def rewrite_query(query: str, history: List[BaseMessage]) -> str:
     """Make follow-up queries standalone using conversation context"""
-    if not history:
+    # No full prior turn means nothing to resolve a reference against
+    if len(history) < 2:
         return query
     
     # Skip rewrite if query seems standalone
@@ -116,16 +152,24 @@ async def rewrite_query(query: str, history: List[BaseMessage]) -> str:
     if not any(word in query.lower() for word in follow_up) and len(query.split()) > 4:
         return query
     
+    cache_key = (query, tuple((m.type, m.content[:150]) for m in history[-4:]))
+    cached = _REWRITE_CACHE.get(cache_key)
+    if cached is not None:
+        return cached
+    
     try:
         llm = get_llm(max_tokens=150)
         if not llm:
             return query
         
         # Build concise history
-        history_text = "\n".join([
-            f"{'User' if isinstance(m, HumanMessage) else 'AI'}: {m.content[:150]}"
-            for m in history[-4:]
-        ])
+        buf = io.StringIO()
+        for i, m in enumerate(history[-4:]):
+            if i:
+                buf.write("\n")
+            buf.write("User: " if isinstance(m, HumanMessage) else "AI: ")
+            buf.write(m.content[:150])
+        history_text = buf.getvalue()
         
         prompt = f"""Previous conversation:
 {history_text}
@@ -142,6 +186,7 @@ Rewritten:"""
         
         if rewritten and len(rewritten) > 5:
             logger.info(f"🔄 Rewritten: {rewritten}")
+            _REWRITE_CACHE[cache_key] = rewritten
             return rewritten
             
     except Exception as e:
@@ -152,6 +197,9 @@ Rewritten:"""
 # ============================================================================
 # LLM & SEARCH
 # ============================================================================
+# One ChatGroq per (max_tokens, key) so each keeps its Groq client and connection pool
+_LLM_CACHE: dict = {}
+
 def get_llm(max_tokens: int = 2048) -> Optional[ChatGroq]:
     """Get LLM with fallback API key handling"""
     try:
@@ -161,13 +209,16 @@ def get_llm(max_tokens: int = 2048) -> Optional[ChatGroq]:
             logger.error("No GROQ API key available")
             return None
         
-        return ChatGroq(
-            api_key=key,
-            model=GROQ_MODEL,
-            temperature=0.3,
-            streaming=True,
-            max_tokens=max_tokens
-        )
+        llm = _LLM_CACHE.get((max_tokens, key))
+        if llm is None:
+            llm = _LLM_CACHE[(max_tokens, key)] = ChatGroq(
+                api_key=key,
+                model=GROQ_MODEL,
+                temperature=0.3,
+                streaming=True,
+                max_tokens=max_tokens
+            )
+        return llm
     except Exception as e:
         logger.error(f"LLM init failed: {e}")
         return None
@@ -196,7 +247,7 @@ async def search_with_timeout(query: str, days: int = 7) -> Optional[dict]:
 # ============================================================================
 def build_system_prompt(response_type: str, has_history: bool) -> str:
     """Dynamic system prompt based on context"""
-    now = datetime.now().strftime('%A, %B %d, %Y')
+    now = today_str('%A, %B %d, %Y')
     
     intro = "Continue the conversation naturally." if has_history else ""
     
@@ -243,6 +294,7 @@ async def stream_analysis(
         # 3. Search if needed
         search_data = None
         sources = []
+        rows = ()  # (title, url, content[:300]) per result, top 8
         
         if classification['needs_search']:
             yield {"type": "status", "content": "🔍 Researching..."}
@@ -254,11 +306,14 @@ async def stream_analysis(
             days = 14 if classification['type'] == 'detailed' else 7
             search_data = await search_with_timeout(search_query, days=days)
             
-            if search_data and search_data.get("results"):
-                sources = [
-                    {"title": r.get("title"), "url": r.get("url")} 
-                    for r in search_data["results"][:8]
-                ]
+            if search_data:
+                # Normalize once; the sources event and the prompt both read these rows
+                rows = tuple(
+                    (r.get("title"), r.get("url"), (r.get("content") or "")[:300])
+                    for r in (search_data.get("results") or [])[:8]
+                )
+            if rows:
+                sources = [{"title": t, "url": u} for t, u, _ in rows]
                 yield {"type": "sources", "sources": sources}
         
         # 4. Get LLM
@@ -279,16 +334,19 @@ async def stream_analysis(
         user_content = query
         if search_data:
             num_results = 8 if classification['type'] == 'detailed' else 4
-            results = search_data.get('results', [])[:num_results]
             
-            sources_text = "\n".join([
-                f"[{i+1}] {r.get('title')}\n{r.get('content', '')[:300]}\nURL: {r.get('url')}\n"
-                for i, r in enumerate(results)
-            ])
+            buf = io.StringIO()
+            for i, (title, url, content) in enumerate(rows[:num_results], 1):
+                if i > 1:
+                    buf.write("\n")
+                buf.write(f"[{i}] {title}\n")
+                buf.write(content)
+                buf.write(f"\nURL: {url}\n")
+            sources_text = buf.getvalue()
             
             user_content = f"""{query}
 
-### SEARCH CONTEXT ({datetime.now().strftime('%d %b %Y')})
+### SEARCH CONTEXT ({today_str('%d %b %Y')})
 Summary: {search_data.get('answer', 'N/A')}
 
 Sources:
@@ -301,12 +359,19 @@ Synthesize a professional response using the above data. Include specific number
 
         # 6. Stream response
         full_response = ""
+        interval = 1.0 / STREAM_TPS if STREAM_TPS > 0 else 0.0
+        last_yield = time.monotonic()
         try:
             async for chunk in llm.astream(messages):
                 if chunk.content:
                     full_response += chunk.content
+                    # Pace only when chunks arrive faster than STREAM_TPS
+                    if interval:
+                        delay = interval - (time.monotonic() - last_yield)
+                        if delay > 0.001:
+                            await asyncio.sleep(delay)
+                        last_yield = time.monotonic()
                     yield {"type": "content", "content": chunk.content}
-                    await asyncio.sleep(0.03)  # Add 50ms delay between chunks for slower streaming
 
         except Exception as stream_err:
             logger.error(f"Stream interrupted: {stream_err}")
@@ -411,6 +476,11 @@ async def cli_chat():
 
 def main():
     """Entry point"""
+    try:
+        import uvloop
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    except ImportError:
+        pass
     asyncio.run(cli_chat())
 
 if __name__ == "__main__":
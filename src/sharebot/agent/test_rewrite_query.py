@@ -0,0 +1,66 @@
+import asyncio
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+# Add project root to path
+sys.path.append(str(Path(__file__).parent.parent.parent.parent))
+
+from langchain_core.messages import AIMessage, HumanMessage
+
+from src.sharebot.agent import tavily_agent
+
+
+class FakeLLM:
+    """Stands in for ChatGroq: records prompts and returns a fixed rewrite"""
+
+    def __init__(self, reply: str):
+        self.reply = reply
+        self.prompts = []
+
+    async def ainvoke(self, messages):
+        self.prompts.append(messages[0].content)
+        return SimpleNamespace(content=self.reply)
+
+
+HISTORY = [
+    HumanMessage(content="How is Tata Motors doing?"),
+    AIMessage(content="Tata Motors (TATAMOTORS) is trading near its 52-week high..."),
+]
+
+
+def _rewrite(query: str, reply: str) -> tuple:
+    llm = FakeLLM(reply)
+    original = tavily_agent.get_llm
+    tavily_agent.get_llm = lambda max_tokens=2048: llm
+    tavily_agent._REWRITE_CACHE.clear()
+    try:
+        return asyncio.run(tavily_agent.rewrite_query(query, HISTORY)), llm
+    finally:
+        tavily_agent.get_llm = original
+
+
+def test_pronoun_follow_up_is_rewritten():
+    """'what is its price?' (a quick query) still gets the entity from history"""
+    rewritten, llm = _rewrite("what is its price?", "Tata Motors share price today")
+    assert rewritten == "Tata Motors share price today"
+    assert len(llm.prompts) == 1 and "Tata Motors" in llm.prompts[0]
+
+
+def test_follow_up_with_uppercase_acronym_is_rewritten():
+    """Acronyms like EPS must not be mistaken for an already-named ticker"""
+    rewritten, _ = _rewrite("what is its EPS?", "Tata Motors EPS latest quarter")
+    assert rewritten == "Tata Motors EPS latest quarter"
+
+
+def test_standalone_query_skips_llm():
+    rewritten, llm = _rewrite("compare quarterly revenue growth of Infosys and Wipro", "unused")
+    assert rewritten == "compare quarterly revenue growth of Infosys and Wipro"
+    assert llm.prompts == []
+
+
+if __name__ == "__main__":
+    test_pronoun_follow_up_is_rewritten()
+    test_follow_up_with_uppercase_acronym_is_rewritten()
+    test_standalone_query_skips_llm()
+    print("✅ rewrite_query tests passed")
@@ -1,29 +1,56 @@
+import asyncio
+import atexit
 import json
+import os
 import sys
 from pathlib import Path
+import functools
 import logging
-import pickle
-import re
-import yfinance as yf  # ✅ added for symbol validation
+import logging.handlers
+import queue
+import time
+
+# Setup logging: callers only enqueue records; a listener thread owns the file/stdout writes
+_log_format = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
+_log_targets = [logging.FileHandler('stock_analysis.log'), logging.StreamHandler(sys.stdout)]
+for _handler in _log_targets:
+    _handler.setFormatter(_log_format)
+_log_queue = queue.SimpleQueue()
+_log_listener = logging.handlers.QueueListener(_log_queue, *_log_targets)
+_log_listener.start()
+atexit.register(_log_listener.stop)
 
-# Setup logging
 logging.basicConfig(
     level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('stock_analysis.log'),
-        logging.StreamHandler(sys.stdout)
-    ]
+    handlers=[logging.handlers.QueueHandler(_log_queue)]
 )
 logger = logging.getLogger(__name__)
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _pretty_json(obj) -> str:
+    """Indented JSON for CLI output (orjson when available; both keep non-ASCII as-is)"""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2).decode()
+    return json.dumps(obj, indent=2, ensure_ascii=False)
+
 # Add the parent directory to the path to import the tool
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from tool.yfinance_tool import (
+    SYMBOL_DB,
+    SYMBOL_DB_LOCK,
+    load_cached_symbol,
+    store_cached_symbol,
+    evict_cached_symbol,
     get_stock_symbol,
     fetch_stock_data,
-    generate_recommendation
+    generate_recommendation,
+    warm_indicator_kernels
 )
 
 from tool.para_info_tool import build_parameter_table
@@ -34,63 +61,169 @@ from tool.para_info_tool import build_parameter_table
 
 CACHE_DIR = Path(".cache")
 CACHE_DIR.mkdir(exist_ok=True)
-SYMBOL_CACHE_FILE = CACHE_DIR / "symbol_cache.pkl"
 
-# Load symbol cache from disk (robust to corruption)
-if SYMBOL_CACHE_FILE.exists():
+# Ticker existence changes on market-day timescales, so validation results are
+# reused for a day (an hour for negatives, in case of a fresh listing)
+VALIDATION_TTL = 24 * 3600
+INVALID_VALIDATION_TTL = 3600
+# symbol -> (is_valid, expiry timestamp); backed by the symbol_validity table
+VALID_CACHE = {}
+
+# Optional list of known NSE tickers (one per line) that never need a network check
+NSE_SYMBOLS_FILE = Path(os.getenv("NSE_SYMBOLS_FILE", str(CACHE_DIR / "nse_symbols.txt")))
+
+
+@functools.lru_cache(maxsize=1)
+def _known_nse_symbols() -> frozenset:
     try:
-        with open(SYMBOL_CACHE_FILE, 'rb') as f:
-            SYMBOL_CACHE = pickle.load(f)
-        if not isinstance(SYMBOL_CACHE, dict):
-            SYMBOL_CACHE = {}
-        logger.info(f"Loaded {len(SYMBOL_CACHE)} cached symbols")
-    except Exception as e:
-        logger.warning(f"Symbol cache load failed (starting fresh): {e}")
-        SYMBOL_CACHE = {}
-else:
-    SYMBOL_CACHE = {}
+        lines = NSE_SYMBOLS_FILE.read_text().split()
+    except OSError:
+        return frozenset()
+    return frozenset(t if t.endswith(".NS") else f"{t}.NS" for t in (line.strip().upper() for line in lines) if t)
+
+
+def _remember_validity(symbol: str, valid: bool, now: float):
+    _remember_validities({symbol: valid}, now)
 
 
-def save_symbol_cache():
-    """Save symbol cache to disk (atomic write to prevent corruption)"""
-    tmp_file = SYMBOL_CACHE_FILE.with_suffix(".pkl.tmp")
+def _remember_validities(results: dict, now: float):
+    """Record {symbol: is_valid} in VALID_CACHE and persist them in one transaction"""
+    rows = []
+    for symbol, valid in results.items():
+        expires = now + (VALIDATION_TTL if valid else INVALID_VALIDATION_TTL)
+        VALID_CACHE[symbol] = (valid, expires)
+        rows.append((symbol, int(valid), expires))
     try:
-        with open(tmp_file, 'wb') as f:
-            pickle.dump(SYMBOL_CACHE, f, protocol=pickle.HIGHEST_PROTOCOL)
-        tmp_file.replace(SYMBOL_CACHE_FILE)
+        with SYMBOL_DB_LOCK:
+            # The connection is in autocommit mode, so a batch needs an explicit
+            # transaction to land as one WAL commit rather than one per row
+            SYMBOL_DB.execute("BEGIN")
+            try:
+                SYMBOL_DB.executemany("INSERT OR REPLACE INTO symbol_validity VALUES (?, ?, ?)", rows)
+            except Exception:
+                SYMBOL_DB.execute("ROLLBACK")
+                raise
+            SYMBOL_DB.execute("COMMIT")
     except Exception as e:
-        logger.error(f"Failed to save symbol cache: {e}")
-        try:
-            if tmp_file.exists():
-                tmp_file.unlink()
-        except Exception:
-            pass
+        logger.warning(f"Failed to persist validation for {len(rows)} symbol(s): {e}")
+
+
+def _cached_validity(symbol: str, now: float):
+    """Unexpired validation result for symbol, or None"""
+    hit = VALID_CACHE.get(symbol)
+    if hit is None:
+        with SYMBOL_DB_LOCK:
+            row = SYMBOL_DB.execute("SELECT valid, expires FROM symbol_validity WHERE symbol=?", (symbol,)).fetchone()
+        if row:
+            hit = VALID_CACHE[symbol] = (bool(row[0]), row[1])
+    if hit and hit[1] > now:
+        return hit[0]
+    return None
 
 
 def is_valid_symbol(symbol: str) -> bool:
     """
     Validate symbol by checking if yfinance returns any recent price data.
-    Keeps it lightweight: 5d history.
+    Keeps it lightweight: 5d history, and results are cached (see VALIDATION_TTL).
     """
     if not symbol:
         return False
+    if symbol in _known_nse_symbols():
+        return True
+
+    now = time.time()
+    cached = _cached_validity(symbol, now)
+    if cached is not None:
+        return cached
+
     try:
+        import yfinance as yf  # deferred: pulls in pandas/numpy on first use
+
         hist = yf.Ticker(symbol).history(period="5d")
-        return hist is not None and not hist.empty
+        valid = hist is not None and not hist.empty
     except Exception:
+        # Network trouble isn't evidence either way, so don't cache it
         return False
+    _remember_validity(symbol, valid, now)
+    return valid
+
+
+_QUOTE_TRANS = str.maketrans("", "", "`\"'")
+
+
+# yf.download error messages that mean "no such ticker" rather than a failed request
+_NO_DATA_MARKERS = ("delisted", "no data found", "no price data", "not found")
+
+
+def bulk_validate(symbols) -> dict:
+    """
+    Validate many symbols with one yf.download burst instead of a history call each.
+    Returns {symbol: is_valid} for the symbols with a conclusive answer and records
+    them in the validation cache. Tickers that failed for network/rate-limit reasons
+    are left out (and not cached), like is_valid_symbol does; returns {} if the whole
+    burst failed.
+    """
+    symbols = sorted({s for s in symbols if s})
+    if not symbols:
+        return {}
+    try:
+        import yfinance as yf  # deferred: pulls in pandas/numpy on first use
+
+        df = yf.download(symbols, period="5d", group_by="ticker", threads=True, progress=False)
+    except Exception as e:
+        logger.warning(f"Bulk symbol validation failed: {e}")
+        return {}
+
+    # yf.download doesn't raise for per-ticker failures: it NaN-fills them and
+    # records the reason in yfinance.shared._ERRORS
+    errors = dict(getattr(getattr(yf, "shared", None), "_ERRORS", None) or {})
+    tickers = set(df.columns.get_level_values(0)) if df is not None and df.columns.nlevels > 1 else set()
+    results = {}
+    for sym in symbols:
+        if sym in tickers and bool(df[sym]["Close"].notna().any()):
+            results[sym] = True
+            continue
+        error = str(errors.get(sym, "")).lower()
+        if error and not any(marker in error for marker in _NO_DATA_MARKERS):
+            continue  # network trouble isn't evidence either way, so don't cache it
+        results[sym] = False
+
+    if not any(results.values()):
+        # Every ticker came back empty: far more likely a throttled/failed burst
+        # than a cache full of dead symbols
+        logger.warning(f"Bulk symbol validation returned no data for {len(symbols)} symbols; not caching")
+        return {}
+    _remember_validities(results, time.time())
+    return results
+
+
+def warm_validation_cache() -> int:
+    """Revalidate every cached symbol whose validation is missing or expired, in one batch"""
+    with SYMBOL_DB_LOCK:
+        symbols = [row[0] for row in SYMBOL_DB.execute("SELECT DISTINCT symbol FROM symbols")]
+    now = time.time()
+    stale = [s for s in map(sanitize_symbol, symbols)
+             if s not in _known_nse_symbols() and _cached_validity(s, now) is None]
+    results = bulk_validate(stale)
+    if results:
+        logger.info(f"Validated {len(results)} cached symbols ({sum(results.values())} valid)")
+    return len(results)
 
 
 def sanitize_symbol(symbol: str) -> str:
     """Defensively sanitize symbols coming from cache/LLM."""
-    symbol = (symbol or "").strip().upper()
-    symbol = symbol.replace("`", "").replace('"', "").replace("'", "").strip()
-    symbol = symbol.splitlines()[0].strip() if symbol else symbol
+    symbol = (symbol or "").strip().upper().translate(_QUOTE_TRANS)
+    # partition stops at the first newline without building a list of lines
+    symbol = symbol.partition("\n")[0].strip()
     if symbol and not symbol.endswith(".NS"):
         symbol += ".NS"
     return symbol
 
 
+# Characters allowed in a ticker-like input (same class as [A-Za-z0-9&._-])
+_TICKER_CHARS = frozenset("abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789&._-")
+
+
 def looks_like_ticker(text: str) -> bool:
     """
     If user types 'bhel', 'itc', 'icici', treat as ticker candidate.
@@ -101,9 +234,7 @@ def looks_like_ticker(text: str) -> bool:
     if not text:
         return False
     t = text.strip()
-    if " " in t:
-        return False
-    return re.fullmatch(r"[A-Za-z0-9&._-]{1,15}", t) is not None
+    return 1 <= len(t) <= 15 and _TICKER_CHARS.issuperset(t)
 
 
 def get_cached_symbol(company_name: str) -> str:
@@ -111,16 +242,17 @@ def get_cached_symbol(company_name: str) -> str:
     cache_key = company_name.lower().strip()
 
     # 1) Cache hit → validate; if invalid, evict
-    if cache_key in SYMBOL_CACHE:
-        cached = sanitize_symbol(SYMBOL_CACHE[cache_key])
+    cached_symbol = load_cached_symbol(cache_key)
+    if cached_symbol is not None:
+        cached = sanitize_symbol(cached_symbol)
         if is_valid_symbol(cached):
-            logger.info(f"Cache hit for '{company_name}' -> {cached}")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(f"Cache hit for '{company_name}' -> {cached}")
             return cached
         else:
             logger.warning(f"Cached symbol invalid for '{company_name}' -> {cached}. Evicting cache entry.")
             try:
-                del SYMBOL_CACHE[cache_key]
-                save_symbol_cache()
+                evict_cached_symbol(cache_key)
             except Exception:
                 pass
 
@@ -129,8 +261,7 @@ def get_cached_symbol(company_name: str) -> str:
         guessed = sanitize_symbol(company_name)
         if is_valid_symbol(guessed):
             logger.info(f"Using direct ticker guess for '{company_name}' -> {guessed}")
-            SYMBOL_CACHE[cache_key] = guessed
-            save_symbol_cache()
+            store_cached_symbol(cache_key, guessed)
             return guessed
 
     # 3) Cache miss → call LLM
@@ -145,12 +276,11 @@ def get_cached_symbol(company_name: str) -> str:
             symbol = fallback
 
     # Store in cache (store normalized)
-    SYMBOL_CACHE[cache_key] = symbol
-    save_symbol_cache()
+    store_cached_symbol(cache_key, symbol)
     return symbol
 
 
-def analyze_stock(company_name: str) -> dict:
+async def analyze_stock(company_name: str) -> dict:
     if not company_name or not company_name.strip():
         return {
             "status": "error",
@@ -165,7 +295,7 @@ def analyze_stock(company_name: str) -> dict:
     try:
         # Step 1: Get stock symbol (cached + validated)
         try:
-            symbol = get_cached_symbol(company_name)
+            symbol = await asyncio.to_thread(get_cached_symbol, company_name)
         except Exception as e:
             logger.error(f"Symbol lookup failed: {e}")
             return {
@@ -178,7 +308,7 @@ def analyze_stock(company_name: str) -> dict:
 
         # Step 2: Fetch stock data
         try:
-            stock_data = fetch_stock_data(symbol)
+            stock_data, metrics = await asyncio.to_thread(fetch_stock_data, symbol)
 
             if not stock_data.get('Current Price') or stock_data.get('Current Price') == 'N/A':
                 return {
@@ -199,21 +329,22 @@ def analyze_stock(company_name: str) -> dict:
                 "recommendation": None
             }
 
-        # Step 2.5: Build UI rows (3 columns)
-        try:
-            ui_rows = build_parameter_table(stock_data)
-        except Exception as e:
-            logger.error(f"UI table build failed: {e}")
+        # Step 2.5 + 3: Build UI rows (3 columns) and generate the recommendation concurrently
+        ui_rows, recommendation = await asyncio.gather(
+            asyncio.to_thread(build_parameter_table, stock_data),
+            asyncio.to_thread(generate_recommendation, metrics),
+            return_exceptions=True
+        )
+
+        if isinstance(ui_rows, Exception):
+            logger.error(f"UI table build failed: {ui_rows}")
             ui_rows = None
 
-        # Step 3: Generate recommendation
-        try:
-            recommendation = generate_recommendation(stock_data)
-        except Exception as e:
-            logger.error(f"Recommendation generation failed: {e}")
+        if isinstance(recommendation, Exception):
+            logger.error(f"Recommendation generation failed: {recommendation}")
             return {
                 "status": "error",
-                "error": f"Failed to generate recommendation: {str(e)}",
+                "error": f"Failed to generate recommendation: {str(recommendation)}",
                 "stock_data": stock_data,
                 "stock_data_ui": ui_rows,
                 "recommendation": None
@@ -257,18 +388,18 @@ def main():
                 break
 
             print(f"\n🔍 Analyzing '{company_name}'...\n")
-            result = analyze_stock(company_name)
+            result = asyncio.run(analyze_stock(company_name))
 
             if result["status"] == "success":
                 print("=" * 60)
                 print("UI TABLE (Parameter | Value | Meaning)")
                 print("=" * 60)
-                print(json.dumps(result["stock_data_ui"], indent=2, ensure_ascii=False))
+                print(_pretty_json(result["stock_data_ui"]))
 
                 print("\n" + "=" * 60)
                 print("RECOMMENDATION")
                 print("=" * 60)
-                print(json.dumps(result["recommendation"], indent=2, ensure_ascii=False))
+                print(_pretty_json(result["recommendation"]))
 
                 print("\n" + "=" * 60)
                 print(f"✅ Analysis completed successfully for {result['symbol']}")
@@ -1,8 +1,9 @@
-from typing import Dict, List
+from types import MappingProxyType
+from typing import Dict, List, Mapping, Tuple
 
 from tool.sanity_checks_tool import build_warnings
 
-PARAMETER_ORDER: List[str] = [
+PARAMETER_ORDER: Tuple[str, ...] = (
     "Company Name",
     "Sector",
     "Stock Symbol",
@@ -55,10 +56,10 @@ PARAMETER_ORDER: List[str] = [
     "Bollinger Band Middle",
     "Bollinger Band Lower",
     "Book Value",
-]
+)
 
 
-PARAMETER_MEANINGS: Dict[str, str] = {
+PARAMETER_MEANINGS: Mapping[str, str] = MappingProxyType({
     "Company Name": "Official name of the company whose stock you're analyzing.",
     "Sector": "Broad business category like Utilities, IT, Banking, or FMCG.",
     "Stock Symbol": "Unique trading code used on exchange, usually ends with .NS.",
@@ -111,32 +112,26 @@ PARAMETER_MEANINGS: Dict[str, str] = {
     "Bollinger Band Middle": "Usually 20-day moving average acting as dynamic support or resistance level.",
     "Bollinger Band Lower": "Lower band indicating weakness or oversold condition when price touches it.",
     "Book Value": "Net assets per share from balance sheet, useful for asset-heavy businesses.",
-}
+})
+
+_DEFAULT_MEANING = "Meaning not available for this parameter yet. It represents a standard stock-related metric used in market analysis."
+
+# (parameter, base meaning) pairs resolved once at import; only values and warnings vary per call
+_BASE_ROWS: Tuple[Tuple[str, str], ...] = tuple((key, PARAMETER_MEANINGS.get(key, _DEFAULT_MEANING)) for key in PARAMETER_ORDER)
 
 def build_parameter_table(stock_data: Dict) -> List[Dict[str, str]]:
-    rows: List[Dict[str, str]] = []
     stock_data = stock_data or {}
 
     warnings = build_warnings(stock_data)
+    get_value = stock_data.get
+    get_warning = warnings.get
 
-    for key in PARAMETER_ORDER:
-        base_meaning = PARAMETER_MEANINGS.get(
-            key,
-            "Meaning not available for this parameter yet. It represents a standard stock-related metric used in market analysis."
-        )
-
-        warn = warnings.get(key)
-        # ✅ Put warning on a new line (still only 3 columns)
-        meaning = base_meaning
-        if warn:
-            meaning = f"{base_meaning}\n⚠️ Note: {warn}"
-
-        rows.append(
-            {
-                "parameter": key,
-                "value": stock_data.get(key, "N/A"),
-                "meaning": meaning,
-            }
-        )
-
-    return rows
\ No newline at end of file
+    # ✅ Put warning on a new line (still only 3 columns)
+    return [
+        {
+            "parameter": key,
+            "value": get_value(key, "N/A"),
+            "meaning": f"{base}\n⚠️ Note: {warn}" if (warn := get_warning(key)) else base,
+        }
+        for key, base in _BASE_ROWS
+    ]
\ No newline at end of file
@@ -1,8 +1,8 @@
-from typing import Dict, List
+from typing import Any, Dict, List, NamedTuple, Tuple
 
 from tool.sanity_checks_tool import build_warnings
 
-PARAMETER_ORDER: List[str] = [
+PARAMETER_ORDER: Tuple[str, ...] = (
     "Company Name",
     "Sector",
     "Stock Symbol",
@@ -55,7 +55,7 @@ PARAMETER_ORDER: List[str] = [
     "Bollinger Band Middle",
     "Bollinger Band Lower",
     "Book Value",
-]
+)
 
 
 PARAMETER_MEANINGS: Dict[str, str] = {
@@ -113,30 +113,35 @@ PARAMETER_MEANINGS: Dict[str, str] = {
     "Book Value": "Net assets per share from balance sheet, useful for asset-heavy businesses",
 }
 
-def build_parameter_table(stock_data: Dict) -> List[Dict[str, str]]:
-    rows: List[Dict[str, str]] = []
+_DEFAULT_MEANING = (
+    "Meaning not available for this parameter yet. It represents a standard stock-related metric used in market analysis."
+)
+
+# (parameter, base meaning) pairs resolved once at import; the table schema is fixed
+_PARAM_BASE = tuple((key, PARAMETER_MEANINGS.get(key, _DEFAULT_MEANING)) for key in PARAMETER_ORDER)
+
+class ParameterRow(NamedTuple):
+    parameter: str
+    value: Any
+    meaning: str
+
+def build_parameter_rows(stock_data: Dict) -> List[ParameterRow]:
     stock_data = stock_data or {}
 
     warnings = build_warnings(stock_data)
+    get_value = stock_data.get
+    get_warning = warnings.get
 
-    for key in PARAMETER_ORDER:
-        base_meaning = PARAMETER_MEANINGS.get(
+    # ✅ Put warning on a new line (still only 3 columns); most keys have none
+    return [
+        ParameterRow(
             key,
-            "Meaning not available for this parameter yet. It represents a standard stock-related metric used in market analysis."
+            get_value(key, "N/A"),
+            base + "\n⚠️ Note: " + warn if (warn := get_warning(key)) else base,
         )
+        for key, base in _PARAM_BASE
+    ]
 
-        warn = warnings.get(key)
-        # ✅ Put warning on a new line (still only 3 columns)
-        meaning = base_meaning
-        if warn:
-            meaning = f"{base_meaning}\n⚠️ Note: {warn}"
-
-        rows.append(
-            {
-                "parameter": key,
-                "value": stock_data.get(key, "N/A"),
-                "meaning": meaning,
-            }
-        )
-
-    return rows
\ No newline at end of file
+def build_parameter_table(stock_data: Dict) -> List[Dict[str, str]]:
+    """JSON boundary: the UI expects {parameter, value, meaning} objects."""
+    return [row._asdict() for row in build_parameter_rows(stock_data)]
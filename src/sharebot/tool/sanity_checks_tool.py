@@ -1,137 +1,240 @@
 # tool/sanity_checks_tool.py
 
-from typing import Dict, Optional
+import functools
+import math
+from collections.abc import Mapping
+from typing import Callable, Dict, Iterator, Optional, Tuple
+
+try:
+    # C parser (fast_float based); returns None instead of raising on bad input
+    from fastnumbers import try_float as _try_float
+except ImportError:
+    _try_float = None
+
+# Currency symbol, thousands separators and percent signs, dropped in one C-level pass
+_CLEAN_TABLE = str.maketrans("", "", "₹,%")
+
+
+def _to_float(cleaned: str) -> Optional[float]:
+    if _try_float is not None:
+        return _try_float(cleaned, on_fail=None, allow_underscores=True)
+    try:
+        return float(cleaned)
+    except Exception:
+        return None
+
 
 def _parse_value(value_str) -> Optional[float]:
     """Extract numeric float from formatted strings like '₹344.40', '18.00%', '8,805,932'."""
     if value_str is None:
         return None
-    s = str(value_str).strip()
+    # Raw numbers need no string cleanup; NaN (missing data from pandas/yfinance) counts as absent
+    if isinstance(value_str, (int, float)) and not isinstance(value_str, bool):
+        v = float(value_str)
+        return None if math.isnan(v) else v
+    return _parse_str(str(value_str))
+
+
+@functools.lru_cache(maxsize=4096)
+def _parse_str(raw: str) -> Optional[float]:
+    """Cached parse of a formatted string; the same values ('N/A', '0.00%') recur across stocks and calls."""
+    s = raw.strip()
     if not s or s == "N/A":
         return None
 
     neg = False
-    if s.startswith("(") and s.endswith(")"):
+    if s[:1] == "(" and s[-1:] == ")":
         neg = True
         s = s[1:-1].strip()
 
-    cleaned = (
-        s.replace("₹", "")
-        .replace("Cr", "")
-        .replace(",", "")
-        .replace("%", "")
-        .strip()
-    )
+    if "Cr" in s:
+        s = s.replace("Cr", "")  # crore suffix, e.g. '₹1,234 Cr'
+    cleaned = s.translate(_CLEAN_TABLE).strip()
 
-    try:
-        v = float(cleaned)
-        return -v if neg else v
-    except Exception:
+    v = _to_float(cleaned)
+    if v is None:
         return None
+    return -v if neg else v
+
+
+_OUT_OF_RANGE = "This percentage looks out of expected range. It may be a formatting/data issue."
+
+# ---------------------------------------------------------------------------
+# Single-field range checks: { parameter: ((low, high, message), ...) }.
+# A rule fires when the value is < low or > high (None = unbounded); the first
+# rule that fires wins, so stricter thresholds come first.
+# ---------------------------------------------------------------------------
+_RANGE_CHECKS: Dict[str, Tuple[Tuple[Optional[float], Optional[float], str], ...]] = {
+    # Dividend sanity (already percent number, e.g. "3.2%" -> 3.2)
+    "Dividend Yield": (
+        (None, 50,
+         "Extremely high yield is usually a data glitch, special one-time dividend, or price distortion. "
+         "Verify from NSE filings/company dividend history before relying on it."),
+        (None, 20,
+         "Unusually high yield. Often caused by special dividends or data issues. "
+         "Confirm the latest dividend announcements and whether it’s recurring."),
+    ),
+    # Debt-to-equity sanity (common scaling issue)
+    "Debt to Equity Ratio": (
+        (None, 10,
+         "This value looks like it may be reported in percent (e.g., 127 means ~1.27). "
+         "Use caution and cross-check with financial statements or another data source."),
+        (None, 5,
+         "Very high leverage. Higher debt can increase risk, especially when interest rates rise. "
+         "Compare with peers and check interest coverage if available."),
+    ),
+    # P/E sanity
+    "P/E Ratio": (
+        (0, None,
+         "Negative P/E usually means the company has negative earnings (losses). "
+         "In this case P/E is not useful for valuation—look at revenue, margins, and turnaround signs."),
+        (None, 100,
+         "Very high P/E suggests the market expects strong growth, or earnings are temporarily low. "
+         "Compare with sector peers and check whether profits are stable."),
+    ),
+    # RSI bounds
+    "RSI (14)": (
+        (0, 100, "RSI should normally be between 0 and 100. This may indicate a data/parse issue."),
+    ),
+    # Liquidity
+    "Current Ratio": (
+        (1, None,
+         "Below 1 can indicate short-term liquidity pressure (current liabilities exceed current assets). "
+         "This can be normal in some businesses, but it’s worth checking cash flows and debt schedule."),
+    ),
+    "Quick Ratio": (
+        (0.5, None,
+         "Low quick ratio suggests limited liquid assets to cover short-term liabilities. "
+         "Not always bad, but beginners should treat it as a caution flag and check cash flow stability."),
+    ),
+    # Volatility sanity (percent number)
+    "Annual Volatility": (
+        (None, 120,
+         "Very high volatility implies large price swings and higher risk. "
+         "Consider position sizing and risk controls, or verify if this is a data anomaly."),
+    ),
+    # 52-week distance sanity
+    "Distance from 52 Week High (%)": ((-100, 200, _OUT_OF_RANGE),),
+    "Distance from 52 Week Low (%)": ((-100, 500, _OUT_OF_RANGE),),
+}
+
+
+def _range_check(field: str, rules) -> Callable:
+    # Band in which no rule can fire; most values land here and skip the rule loop
+    safe_low = max((low for low, _, _ in rules if low is not None), default=-math.inf)
+    safe_high = min((high for _, high, _ in rules if high is not None), default=math.inf)
+
+    def check(num) -> Optional[str]:
+        val = num(field)
+        if val is None or safe_low <= val <= safe_high:
+            return None
+        for low, high, message in rules:
+            if (low is not None and val < low) or (high is not None and val > high):
+                return message
+        return None
+    return check
 
 
-def build_warnings(stock_data: Dict) -> Dict[str, str]:
-    """
-    Returns a dict: { parameter_name: warning_message }
-    Only includes keys that need warnings.
-    """
-    w: Dict[str, str] = {}
-    d = stock_data or {}
-
-    current_price = _parse_value(d.get("Current Price"))
-    dividend_yield_pct = _parse_value(d.get("Dividend Yield"))   # already percent number (e.g., "3.2%" -> 3.2)
-    dividend_rate = _parse_value(d.get("Dividend Rate"))
-    debt_to_equity = _parse_value(d.get("Debt to Equity Ratio"))
-    pe = _parse_value(d.get("P/E Ratio"))
-    fwd_pe = _parse_value(d.get("Forward P/E Ratio"))
-    rsi = _parse_value(d.get("RSI (14)"))
-    current_ratio = _parse_value(d.get("Current Ratio"))
-    quick_ratio = _parse_value(d.get("Quick Ratio"))
-    vol_pct = _parse_value(d.get("Annual Volatility"))
-    dist_high = _parse_value(d.get("Distance from 52 Week High (%)"))
-    dist_low = _parse_value(d.get("Distance from 52 Week Low (%)"))
-
-    # Dividend sanity
-    if dividend_yield_pct is not None:
-        if dividend_yield_pct > 50:
-            w["Dividend Yield"] = (
-                "Extremely high yield is usually a data glitch, special one-time dividend, or price distortion. "
-                "Verify from NSE filings/company dividend history before relying on it."
-            )
-        elif dividend_yield_pct > 20:
-            w["Dividend Yield"] = (
-                "Unusually high yield. Often caused by special dividends or data issues. "
-                "Confirm the latest dividend announcements and whether it’s recurring."
-            )
-
+# ---------------------------------------------------------------------------
+# Cross-field checks. Each takes `num(field)` (a cached parsed value) and
+# returns a warning string or None.
+# ---------------------------------------------------------------------------
+def _check_dividend_rate(num) -> Optional[str]:
     # Cross-check dividend rate vs price (extra hint)
+    current_price = num("Current Price")
+    dividend_rate = num("Dividend Rate")
     if current_price and dividend_rate:
         implied_yield = (dividend_rate / current_price) * 100
-        if implied_yield > 20 and dividend_yield_pct is None:
-            w["Dividend Rate"] = (
+        if implied_yield > 20 and num("Dividend Yield") is None:
+            return (
                 "Dividend looks very large versus current price. Check if this includes special dividends or if data is stale."
             )
+    return None
 
-    # Debt-to-equity sanity (common scaling issue)
-    if debt_to_equity is not None:
-        if debt_to_equity > 10:
-            w["Debt to Equity Ratio"] = (
-                "This value looks like it may be reported in percent (e.g., 127 means ~1.27). "
-                "Use caution and cross-check with financial statements or another data source."
-            )
-        elif debt_to_equity > 5:
-            w["Debt to Equity Ratio"] = (
-                "Very high leverage. Higher debt can increase risk, especially when interest rates rise. "
-                "Compare with peers and check interest coverage if available."
-            )
-
-    # P/E sanity
-    if pe is not None and pe < 0:
-        w["P/E Ratio"] = (
-            "Negative P/E usually means the company has negative earnings (losses). "
-            "In this case P/E is not useful for valuation—look at revenue, margins, and turnaround signs."
-        )
-    if pe is not None and pe > 100:
-        w["P/E Ratio"] = (
-            "Very high P/E suggests the market expects strong growth, or earnings are temporarily low. "
-            "Compare with sector peers and check whether profits are stable."
-        )
 
+def _check_forward_pe(num) -> Optional[str]:
+    fwd_pe = num("Forward P/E Ratio")
+    pe = num("P/E Ratio")
     if fwd_pe is not None and pe is not None and fwd_pe > pe * 1.5:
-        w["Forward P/E Ratio"] = (
+        return (
             "Forward P/E much higher than current P/E may indicate expected earnings drop or conservative forecasts. "
             "Check guidance and recent quarterly results."
         )
+    return None
 
-    # RSI bounds
-    if rsi is not None and (rsi < 0 or rsi > 100):
-        w["RSI (14)"] = "RSI should normally be between 0 and 100. This may indicate a data/parse issue."
 
-    # Liquidity
-    if current_ratio is not None and current_ratio < 1:
-        w["Current Ratio"] = (
-            "Below 1 can indicate short-term liquidity pressure (current liabilities exceed current assets). "
-            "This can be normal in some businesses, but it’s worth checking cash flows and debt schedule."
-        )
+_CHECKS: Dict[str, Callable] = {name: _range_check(name, rules) for name, rules in _RANGE_CHECKS.items()}
+_CHECKS["Dividend Rate"] = _check_dividend_rate
+_CHECKS["Forward P/E Ratio"] = _check_forward_pe
 
-    if quick_ratio is not None and quick_ratio < 0.5:
-        w["Quick Ratio"] = (
-            "Low quick ratio suggests limited liquid assets to cover short-term liabilities. "
-            "Not always bad, but beginners should treat it as a caution flag and check cash flow stability."
-        )
 
-    # Volatility sanity (percent number)
-    if vol_pct is not None and vol_pct > 120:
-        w["Annual Volatility"] = (
-            "Very high volatility implies large price swings and higher risk. "
-            "Consider position sizing and risk controls, or verify if this is a data anomaly."
-        )
+# Every field any check reads, parsed together when the whole mapping is needed
+_CHECK_FIELDS = (
+    "Current Price",
+    "Dividend Yield",
+    "Dividend Rate",
+    "Debt to Equity Ratio",
+    "P/E Ratio",
+    "Forward P/E Ratio",
+    "RSI (14)",
+    "Current Ratio",
+    "Quick Ratio",
+    "Annual Volatility",
+    "Distance from 52 Week High (%)",
+    "Distance from 52 Week Low (%)",
+)
 
-    # 52-week distance sanity
-    if dist_high is not None and (dist_high < -100 or dist_high > 200):
-        w["Distance from 52 Week High (%)"] = "This percentage looks out of expected range. It may be a formatting/data issue."
-    if dist_low is not None and (dist_low < -100 or dist_low > 500):
-        w["Distance from 52 Week Low (%)"] = "This percentage looks out of expected range. It may be a formatting/data issue."
 
-    return w
- 
\ No newline at end of file
+class LazyWarnings(Mapping):
+    """
+    Read-only { parameter_name: warning_message } mapping that runs each check
+    only when its key is first looked up, then remembers the result.
+    Only keys that need warnings are present.
+    """
+
+    def __init__(self, stock_data: Dict):
+        self._data = stock_data or {}
+        self._nums: Dict[str, Optional[float]] = {}
+        self._results: Dict[str, Optional[str]] = {}
+
+    def _num(self, field: str) -> Optional[float]:
+        if field not in self._nums:
+            self._nums[field] = _parse_value(self._data.get(field))
+        return self._nums[field]
+
+    def _parse_all(self) -> None:
+        """Batch-parse every check field in one pass (C-level map over the cached parser)."""
+        if len(self._nums) < len(_CHECK_FIELDS):
+            self._nums.update(zip(_CHECK_FIELDS, map(_parse_value, map(self._data.get, _CHECK_FIELDS))))
+
+    def get(self, key, default=None):
+        if key in self._results:
+            result = self._results[key]
+        else:
+            check = _CHECKS.get(key)
+            if check is None:
+                return default
+            result = self._results[key] = check(self._num)
+        return default if result is None else result
+
+    def __getitem__(self, key: str) -> str:
+        result = self.get(key)
+        if result is None:
+            raise KeyError(key)
+        return result
+
+    def __iter__(self) -> Iterator[str]:
+        # Iterating needs every check, so skip the per-field lazy path
+        self._parse_all()
+        return (key for key in _CHECKS if self.get(key) is not None)
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+
+def build_warnings(stock_data: Dict) -> Mapping[str, str]:
+    """
+    Returns a mapping: { parameter_name: warning_message }
+    Only includes keys that need warnings; each check runs on first lookup.
+    """
+    return LazyWarnings(stock_data)
@@ -1,18 +1,37 @@
 
 import os
+import re
 import json
 import logging
+import threading
 from datetime import datetime, timedelta
+from cachetools import TTLCache
 from tavily import TavilyClient
 from dotenv import load_dotenv
 
+from src.utils.dates import today_str
+
 load_dotenv(override=True)
 
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("TavilyTool")
 
 TAVILY_API_KEY = os.getenv("TAVILY_API_KEY")
 
+# Query keyword groups, each matched in a single case-insensitive scan (substring semantics)
+_INDIA_RE = re.compile(r"india|indian|nse|bse|nifty|sensex", re.I)
+_IPO_RE = re.compile(r"ipo", re.I)
+_PRICE_RE = re.compile(r"price|current|today|latest", re.I)
+
+# Formatted results keyed on (enhanced_query, days). Date-stamped price queries
+# go stale fast, so they get a shorter TTL than IPO and general queries.
+# Searches run in worker threads, so access goes through a lock.
+_SEARCH_CACHE = TTLCache(maxsize=512, ttl=int(os.getenv("SEARCH_CACHE_TTL", "300")))
+_PRICE_SEARCH_CACHE = TTLCache(maxsize=512, ttl=int(os.getenv("PRICE_SEARCH_CACHE_TTL", "60")))
+_CACHE_LOCK = threading.Lock()
+
+_IPO_QUERY_TMPL = "latest current open upcoming IPO India today {date} ipowatch.in NSE BSE"
+
+
 def get_tavily_client():
     """Initialize and return Tavily client"""
     if not TAVILY_API_KEY:
@@ -38,24 +57,33 @@ def research_financial_data(query: str, days: int = 7) -> dict:
 
     try:
         # Add current date context for real-time queries
-        current_date = datetime.now().strftime("%B %d, %Y")
+        current_date = today_str()
         
         # Smart query enhancement for Indian market
         enhanced_query = query
-        lower_query = query.lower()
         
         # Only add "India" context if not already present
-        if not any(word in lower_query for word in ["india", "indian", "nse", "bse", "nifty", "sensex"]):
+        if not _INDIA_RE.search(query):
             enhanced_query = f"{query} India NSE BSE"
         
+        cache = _SEARCH_CACHE
+        
         # SPECIAL: IPO Query Optimization
-        if "ipo" in lower_query:
+        if _IPO_RE.search(query):
             # ipowatch.in is the gold standard for Indian IPO info
-            enhanced_query = f"latest current open upcoming IPO India today {current_date} ipowatch.in NSE BSE"
+            enhanced_query = _IPO_QUERY_TMPL.format(date=current_date)
         
         # For price queries, add "today" or "latest"
-        elif any(word in lower_query for word in ["price", "current", "today", "latest"]):
+        elif _PRICE_RE.search(query):
             enhanced_query = f"{enhanced_query} today {current_date} latest stock price"
+            cache = _PRICE_SEARCH_CACHE
+        
+        cache_key = (enhanced_query, days)
+        with _CACHE_LOCK:
+            cached = cache.get(cache_key)
+        if cached is not None:
+            logger.info(f"Tavily cache hit: {enhanced_query}")
+            return {**cached, "query": query}
         
         logger.info(f"Tavily search: {enhanced_query}")
         
@@ -87,19 +115,21 @@ def research_financial_data(query: str, days: int = 7) -> dict:
             "query": query,
             "search_date": current_date,
             "answer": search_results.get("answer", "No direct answer found."),
-            "results": []
+            "results": [
+                {
+                    "title": res.get("title", "Untitled"),
+                    "url": res.get("url", "#"),
+                    "content": res.get("content", "")[:500],  # Increased to 500 characters
+                    "published_date": res.get("published_date", "N/A"),
+                    "score": round(res.get("score", 0), 2)
+                }
+                for res in search_results.get("results", [])
+            ]
         }
 
-        for res in search_results.get("results", []):
-            formatted_results["results"].append({
-                "title": res.get("title", "Untitled"),
-                "url": res.get("url", "#"),
-                "content": res.get("content", "")[:500],  # Increased to 500 characters
-                "published_date": res.get("published_date", "N/A"),
-                "score": round(res.get("score", 0), 2)
-            })
-
         logger.info(f"Found {len(formatted_results['results'])} results")
+        with _CACHE_LOCK:
+            cache[cache_key] = formatted_results
         return formatted_results
 
     except Exception as e:
@@ -109,6 +139,7 @@ def research_financial_data(query: str, days: int = 7) -> dict:
 
 def main():
     """CLI testing"""
+    logging.basicConfig(level=logging.INFO)
     print("=" * 60)
     print("🔍 TAVILY FINANCIAL RESEARCH TOOL")
     print("=" * 60)
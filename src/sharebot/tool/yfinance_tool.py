@@ -1,21 +1,29 @@
-import yfinance as yf
+import asyncio
+import functools
 import json
+import math
 import os
-import pandas as pd
-import numpy as np
-from groq import Groq
+import pickle
+import sqlite3
+import time
 from src.utils.llm_balancer import balancer
+from src.utils._njit import njit
 from dotenv import load_dotenv
-import pickle
 from pathlib import Path
 from datetime import datetime, timedelta
 import logging
 import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
 load_dotenv(override=True)
 
 logger = logging.getLogger(__name__)
 
+# yfinance, pandas, numpy and groq are imported inside the functions that use
+# them, so importing this module (and the API that imports it) stays cheap;
+# after the first call each import is just a sys.modules lookup.
+
 # ============================================================================
 # CACHING SETUP
 # ============================================================================
@@ -23,29 +31,61 @@ CACHE_DIR = Path(".cache/stock_data")
 CACHE_DIR.mkdir(parents=True, exist_ok=True)
 CACHE_DURATION = timedelta(minutes=15)  # Cache stock data for 15 minutes
 
+# Symbols fetched at once by fetch_stock_data_async
+FETCH_CONCURRENCY = int(os.getenv("YF_FETCH_CONCURRENCY", "8"))
+
+# Shared pool for the per-symbol info / history requests (2 per symbol in flight)
+_FETCH_POOL = ThreadPoolExecutor(max_workers=2 * FETCH_CONCURRENCY, thread_name_prefix="yf-fetch")
+FETCH_TIMEOUT = 10  # seconds per yfinance call
+
+# (info key, fast_info key) for current price, previous close, open, day high, day low
+_QUOTE_SOURCES = (
+    ("currentPrice", "last_price"),
+    ("previousClose", "previous_close"),
+    ("open", "open"),
+    ("dayHigh", "day_high"),
+    ("dayLow", "day_low"),
+)
+
+# Backticks and quotes the LLM sometimes wraps the symbol in, deleted in one pass
+_QUOTE_TRANS = str.maketrans("", "", "`\"'")
+_NSE_TICKER_RE = re.compile(r"\b([A-Z0-9&._-]+\.NS)\b")
+
+# Short classification task; a smaller/faster model can be set via GROQ_SYMBOL_MODEL
+SYMBOL_MODEL = os.getenv("GROQ_SYMBOL_MODEL") or os.getenv("GROQ_MODEL", "llama-3.3-70b-versatile")
+
+# One Groq client per API key, so repeat lookups reuse its pooled keep-alive connections
+_GROQ_CLIENTS = {}
+
+
+def _cache_file(symbol):
+    return CACHE_DIR / f"{symbol.replace('.', '_')}.json"
+
 
 def get_cached_data(symbol):
-    """Get cached stock data if available and fresh"""
-    cache_file = CACHE_DIR / f"{symbol.replace('.', '_')}.pkl"
-    if cache_file.exists():
-        try:
-            with open(cache_file, "rb") as f:
-                cached = pickle.load(f)
-                if datetime.now() - cached["timestamp"] < CACHE_DURATION:
-                    return cached["data"]
-        except Exception as e:
-            logger.debug(f"Cache read error for {symbol}: {e}")
+    """Get cached (display_data, metrics) if available and fresh (freshness comes from the file's mtime)"""
+    cache_file = _cache_file(symbol)
+    try:
+        if datetime.now() - datetime.fromtimestamp(cache_file.stat().st_mtime) >= CACHE_DURATION:
+            return None
+        with open(cache_file, "r", encoding="utf-8") as f:
+            cached = json.load(f)
+        return cached["data"], cached["metrics"]
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logger.debug(f"Cache read error for {symbol}: {e}")
     return None
 
 
-def save_cached_data(symbol, data):
-    """Save stock data to cache"""
-    cache_file = CACHE_DIR / f"{symbol.replace('.', '_')}.pkl"
-    tmp_file = cache_file.with_suffix(".pkl.tmp")
+def save_cached_data(symbol, data, metrics):
+    """Save stock data to cache (display strings and floats/None, so plain JSON)"""
+    cache_file = _cache_file(symbol)
+    tmp_file = cache_file.with_suffix(".json.tmp")
     try:
-        with open(tmp_file, "wb") as f:
-            pickle.dump({"timestamp": datetime.now(), "data": data}, f, protocol=pickle.HIGHEST_PROTOCOL)
-        tmp_file.replace(cache_file)  # atomic on most platforms
+        with open(tmp_file, "w", encoding="utf-8") as f:
+            json.dump({"data": data, "metrics": metrics}, f, ensure_ascii=False)
+        tmp_file.replace(cache_file)  # atomic on most platforms; mtime marks the save time
     except Exception as e:
         logger.debug(f"Cache write error for {symbol}: {e}")
         try:
@@ -55,10 +95,97 @@ def save_cached_data(symbol, data):
             pass
 
 
+# company name -> NSE symbol (plus symbol validity, see yfinance_agent), persisted across restarts
+SYMBOL_DB_FILE = CACHE_DIR.parent / "symbols.db"
+# Legacy whole-dict pickle, imported into SQLite once and then removed
+LEGACY_SYMBOL_CACHE_FILE = CACHE_DIR.parent / "symbol_cache.pkl"
+
+# SQLite in WAL mode: single-row upserts instead of rewriting the whole cache, and
+# safe to share between worker processes. One connection per process, serialised
+# by a lock since requests run on several threads.
+SYMBOL_DB = sqlite3.connect(SYMBOL_DB_FILE, isolation_level=None, check_same_thread=False)
+SYMBOL_DB.execute("PRAGMA journal_mode=WAL")
+SYMBOL_DB.execute("PRAGMA synchronous=NORMAL")
+SYMBOL_DB.execute("CREATE TABLE IF NOT EXISTS symbols(key TEXT PRIMARY KEY, symbol TEXT, ts REAL)")
+SYMBOL_DB.execute("CREATE TABLE IF NOT EXISTS symbol_validity(symbol TEXT PRIMARY KEY, valid INTEGER, expires REAL)")
+SYMBOL_DB_LOCK = threading.Lock()
+
+
+def _migrate_legacy_symbol_cache():
+    """Import entries from the old pickle cache (robust to corruption)"""
+    if not LEGACY_SYMBOL_CACHE_FILE.exists():
+        return
+    try:
+        with open(LEGACY_SYMBOL_CACHE_FILE, 'rb') as f:
+            legacy = pickle.load(f)
+        if isinstance(legacy, dict):
+            now = time.time()
+            with SYMBOL_DB_LOCK:
+                SYMBOL_DB.executemany(
+                    "INSERT OR IGNORE INTO symbols VALUES (?, ?, ?)",
+                    [(k, v, now) for k, v in legacy.items()]
+                )
+            logger.info(f"Migrated {len(legacy)} cached symbols to SQLite")
+        LEGACY_SYMBOL_CACHE_FILE.unlink()
+    except Exception as e:
+        logger.warning(f"Legacy symbol cache migration failed (skipping): {e}")
+
+
+_migrate_legacy_symbol_cache()
+
+
+@functools.lru_cache(maxsize=1024)
+def load_cached_symbol(cache_key: str):
+    """Cached symbol for a normalised company name, or None (hot keys skip SQLite)"""
+    with SYMBOL_DB_LOCK:
+        row = SYMBOL_DB.execute("SELECT symbol FROM symbols WHERE key=?", (cache_key,)).fetchone()
+    return row[0] if row else None
+
+
+def store_cached_symbol(cache_key: str, symbol: str):
+    """Upsert one symbol mapping"""
+    try:
+        with SYMBOL_DB_LOCK:
+            SYMBOL_DB.execute("INSERT OR REPLACE INTO symbols VALUES (?, ?, ?)", (cache_key, symbol, time.time()))
+    except Exception as e:
+        logger.error(f"Failed to save symbol cache: {e}")
+    load_cached_symbol.cache_clear()
+
+
+def evict_cached_symbol(cache_key: str):
+    """Remove one symbol mapping"""
+    with SYMBOL_DB_LOCK:
+        SYMBOL_DB.execute("DELETE FROM symbols WHERE key=?", (cache_key,))
+    load_cached_symbol.cache_clear()
+
+
 def get_stock_symbol(company_name):
+    """Map company name to NSE symbol; the Groq lookup runs only on a symbol cache miss"""
+    key = (company_name or "").lower().strip()
+    symbol = load_cached_symbol(key)
+    if symbol:
+        return symbol
+
+    symbol = _lookup_stock_symbol(company_name)
+    if symbol:
+        store_cached_symbol(key, symbol)
+    return symbol
+
+
+def _groq_client():
+    """Groq client for the next balanced API key (created once per key)"""
+    key = balancer.get_next_key()
+    client = _GROQ_CLIENTS.get(key)
+    if client is None:
+        from groq import Groq
+
+        client = _GROQ_CLIENTS[key] = Groq(api_key=key)
+    return client
+
+
+def _lookup_stock_symbol(company_name):
     """Map company name to NSE symbol using Groq LLM"""
-    next_key = balancer.get_next_key()
-    client = Groq(api_key=next_key)
+    client = _groq_client()
 
     prompt = f"""You are an expert in Indian stock markets and NSE symbols.
 
@@ -82,21 +209,38 @@ Examples:
 
 Your response (symbol only):"""
 
-    response = client.chat.completions.create(
-        model=os.getenv("GROQ_MODEL"),
+    stream = client.chat.completions.create(
+        model=SYMBOL_MODEL,
         messages=[{"role": "user", "content": prompt}],
         temperature=0,
         max_tokens=20,
+        stream=True,
     )
 
-    raw = (response.choices[0].message.content or "").strip()
+    # Stop reading as soon as the first line is complete or a full .NS ticker is followed by another character
+    raw = ""
+    try:
+        for chunk in stream:
+            if not chunk.choices:
+                continue
+            raw += chunk.choices[0].delta.content or ""
+            text = raw.lstrip()
+            if "\n" in text:
+                break
+            m = _NSE_TICKER_RE.search(text.upper())
+            if m and m.end() < len(text):
+                break
+    finally:
+        stream.close()
+
+    raw = raw.strip()
 
     # Sanitize common LLM formatting issues (backticks, quotes, code fences)
-    raw = raw.replace("`", "").replace('"', "").replace("'", "").strip()
-    raw = raw.splitlines()[0].strip()
+    raw = raw.translate(_QUOTE_TRANS).strip()
+    raw = raw.splitlines()[0].strip() if raw else raw
 
     # Extract the first thing that looks like a NSE ticker with .NS
-    m = re.search(r"\b([A-Z0-9&._-]+\.NS)\b", raw.upper())
+    m = _NSE_TICKER_RE.search(raw.upper())
     if m:
         return m.group(1).strip()
 
@@ -107,367 +251,511 @@ Your response (symbol only):"""
     return sym
 
 
+# value_type -> formatter for an already-float value; anything else uses two decimals
+_FORMATTERS = {
+    "currency": lambda v: f"₹{v:.2f}",
+    "crores": lambda v: f"₹{(v / 10000000):.2f} Cr",
+    "percentage": lambda v: f"{(v * 100):.2f}%",
+    "ratio": lambda v: f"{v:.2f}",
+    "number": lambda v: f"{v:,.0f}",
+}
+
+
+def _format_default(v):
+    return f"{v:.2f}"
+
+
 def format_value(value, value_type):
     """Format values with appropriate symbols and decimals"""
-    if value is None or (isinstance(value, float) and np.isnan(value)):
-        return "N/A"
-
     try:
-        if value_type == "currency":
-            return f"₹{float(value):.2f}"
-        elif value_type == "crores":
-            return f"₹{(float(value) / 10000000):.2f} Cr"
-        elif value_type == "percentage":
-            return f"{(float(value) * 100):.2f}%"
-        elif value_type == "ratio":
-            return f"{float(value):.2f}"
-        elif value_type == "number":
-            return f"{float(value):,.0f}"
-        else:
-            return f"{float(value):.2f}"
+        if value is None or value != value:  # NaN is the only value unequal to itself
+            return "N/A"
+        return _FORMATTERS.get(value_type, _format_default)(float(value))
     except Exception:
         return "N/A"
 
 
-def calculate_rsi(prices, period=14):
-    """Calculate Relative Strength Index (Wilder's RSI)"""
-    if prices is None or len(prices) < period + 1:
+def _metric_value(value, value_type):
+    """
+    Numeric counterpart of format_value: same units (percentages as 0-100, crores scaled)
+    but unrounded; None wherever format_value would give "N/A".
+    """
+    if value is None:
         return None
-
-    prices = pd.Series(prices).dropna()
-    if len(prices) < period + 1:
+    try:
+        value = float(value)
+    except Exception:
+        return None
+    if math.isnan(value):
         return None
+    if value_type == "percentage":
+        return value * 100
+    if value_type == "crores":
+        return value / 10000000
+    return value
+
+
+# ---------------------------------------------------------------------------
+# Indicator kernels: plain loops over contiguous float64 arrays, JIT-compiled
+# by numba when it is installed (see src/utils/_njit.py).
+# ---------------------------------------------------------------------------
+@njit(cache=True)
+def _ema_loop(x, alpha):
+    """EMA with pandas' adjust=False recursion (seeded with the first value)."""
+    out = x.copy()
+    acc = x[0]
+    for i in range(1, len(x)):
+        acc = (1.0 - alpha) * acc + alpha * x[i]
+        out[i] = acc
+    return out
+
+
+@njit(cache=True)
+def _rsi_loop(delta, period):
+    """Last Wilder RSI value from price differences (EMA of gains/losses, alpha = 1/period)."""
+    alpha = 1.0 / period
+    gain = delta[0] if delta[0] > 0 else 0.0
+    loss = -delta[0] if delta[0] < 0 else 0.0
+    for i in range(1, len(delta)):
+        d = delta[i]
+        gain = (1.0 - alpha) * gain + alpha * (d if d > 0 else 0.0)
+        loss = (1.0 - alpha) * loss + alpha * (-d if d < 0 else 0.0)
+    if loss == 0:
+        return 100.0  # no losses => RSI maxed
+    return 100.0 - 100.0 / (1.0 + gain / loss)
 
-    delta = prices.diff()
-    gain = delta.clip(lower=0)
-    loss = -delta.clip(upper=0)
 
-    # Wilder's smoothing via EMA with alpha = 1/period
-    avg_gain = gain.ewm(alpha=1 / period, adjust=False).mean()
-    avg_loss = loss.ewm(alpha=1 / period, adjust=False).mean()
+@njit(cache=True)
+def _tail_mean_std(x, window):
+    """Mean and sample std (ddof=1) of the last `window` values only (Welford, no allocation)."""
+    mean = 0.0
+    m2 = 0.0
+    k = 0
+    for i in range(len(x) - window, len(x)):
+        v = x[i]
+        if v != v:
+            return math.nan, math.nan
+        k += 1
+        d = v - mean
+        mean += d / k
+        m2 += d * (v - mean)
+    if k < 2:
+        return mean, math.nan
+    return mean, math.sqrt(m2 / (k - 1))
 
-    last_gain = avg_gain.iloc[-1]
-    last_loss = avg_loss.iloc[-1]
-    if pd.isna(last_gain) or pd.isna(last_loss):
-        return None
 
-    if last_loss == 0:
-        return 100.0  # no losses => RSI maxed
+def _drop_nan(arr):
+    import numpy as np
 
-    rs = last_gain / last_loss
-    rsi = 100 - (100 / (1 + rs))
-    return float(rsi)
+    nan_mask = np.isnan(arr)
+    return arr[~nan_mask] if nan_mask.any() else arr
 
 
-def calculate_macd(prices):
-    """Calculate MACD"""
-    if prices is None or len(prices) < 26:
-        return None, None
+_INDICATOR_KEYS = (
+    "rsi", "macd", "macd_signal", "bb_upper", "bb_middle", "bb_lower",
+    "volatility", "sma_20", "sma_50", "sma_200",
+)
 
-    prices = pd.Series(prices).dropna()
-    if len(prices) < 26:
-        return None, None
 
-    exp1 = prices.ewm(span=12, adjust=False).mean()
-    exp2 = prices.ewm(span=26, adjust=False).mean()
-    macd = exp1 - exp2
-    signal = macd.ewm(span=9, adjust=False).mean()
-    return float(macd.iloc[-1]), float(signal.iloc[-1])
+_SMA_WINDOWS = (20, 50, 200)
 
 
-def calculate_bollinger_bands(prices, period=20):
-    """Calculate Bollinger Bands"""
-    if prices is None or len(prices) < period:
-        return None, None, None
+def compute_indicators(close):
+    """
+    RSI(14), MACD(12/26/9), Bollinger(20), 30-day volatility and SMA 20/50/200 from one
+    1y close array, without building intermediate Series. Windows match the history
+    slices fetch_stock_data used before: RSI/MACD on the last 63 sessions, Bollinger
+    and SMA20 on the last 21. Missing inputs give None for the affected keys.
+    """
+    import numpy as np
+
+    out = dict.fromkeys(_INDICATOR_KEYS)
+    if close is None or len(close) == 0:
+        return out
+
+    close = np.asarray(close, dtype=float)
+    n = len(close)
+    close_3mo = close[-63:]
+    close_1mo = close[-21:]
+
+    # Moving averages: only the last value is needed, so average the tail window
+    # directly (O(window), no rolling series). NaN in the window gives NaN, like rolling().mean().
+    for window in _SMA_WINDOWS:
+        if n >= window:
+            out[f"sma_{window}"] = float(close[-window:].mean())
+
+    valid_3mo = _drop_nan(close_3mo)
+
+    # RSI: Wilder's smoothing (EMA, alpha = 1/14) of gains and losses
+    if len(valid_3mo) >= 15:
+        out["rsi"] = float(_rsi_loop(np.diff(valid_3mo), 14))
+
+    # MACD: EMA12 - EMA26, signal = EMA9 of MACD (alpha = 2 / (span + 1))
+    if len(valid_3mo) >= 26:
+        macd = _ema_loop(valid_3mo, 2 / 13) - _ema_loop(valid_3mo, 2 / 27)
+        out["macd"] = float(macd[-1])
+        out["macd_signal"] = float(_ema_loop(macd, 2 / 10)[-1])
+
+    # Bollinger Bands on the last 20 valid closes of the 1-month slice
+    valid_1mo = _drop_nan(close_1mo)
+    if len(valid_1mo) >= 20:
+        mid, std = _tail_mean_std(valid_1mo, 20)
+        out["bb_upper"], out["bb_middle"], out["bb_lower"] = float(mid + 2 * std), float(mid), float(mid - 2 * std)
+
+    # Annualized volatility of the last 30 daily log returns
+    valid = _drop_nan(close)
+    if len(valid) >= 31:
+        tail = valid[-31:]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            log_returns = np.diff(np.log(np.where(tail == 0, np.nan, tail)))
+        vol = _tail_mean_std(log_returns, 30)[1] * math.sqrt(252)
+        out["volatility"] = None if math.isnan(vol) else float(vol)
+
+    return out
+
+
+def warm_indicator_kernels():
+    """
+    Compile (or load from numba's on-disk cache) every indicator kernel by running
+    compute_indicators on a synthetic series, so the first real request doesn't
+    pay the JIT cost. fastmath is deliberately not enabled: the kernels rely on
+    NaN checks (v != v) that fastmath is allowed to optimise away.
+    """
+    import numpy as np
 
-    prices = pd.Series(prices).dropna()
-    if len(prices) < period:
-        return None, None, None
+    compute_indicators(np.linspace(100.0, 200.0, 252))
 
-    sma = prices.rolling(window=period).mean()
-    std = prices.rolling(window=period).std()
-    upper = sma + (std * 2)
-    lower = sma - (std * 2)
-    return float(upper.iloc[-1]), float(sma.iloc[-1]), float(lower.iloc[-1])
 
+def _download_histories(symbols):
+    """
+    One yf.download call for all symbols (yfinance fans the requests out on its own threads).
+    Returns {symbol: 1y OHLCV DataFrame}; symbols missing from the result are simply absent.
+    """
+    import yfinance as yf
 
-def calculate_volatility(prices, period=30):
-    """Calculate historical volatility (annualized)"""
-    if prices is None or len(prices) < period + 1:
-        return None
+    try:
+        df = yf.download(
+            symbols,
+            period="1y",
+            group_by="ticker",
+            auto_adjust=True,  # match Ticker.history defaults
+            threads=True,
+            progress=False,
+        )
+    except Exception as e:
+        logger.debug(f"yfinance batch download error for {symbols}: {e}")
+        return {}
+
+    if df is None or df.empty:
+        return {}
+
+    histories = {}
+    tickers = set(df.columns.get_level_values(0)) if df.columns.nlevels > 1 else set()
+    for sym in symbols:
+        if sym in tickers:
+            # Rows are aligned across tickers; drop dates this symbol didn't trade
+            hist = df[sym].dropna(how="all")
+            if not hist.empty:
+                histories[sym] = hist
+    return histories
+
+
+def _split_cached(symbols):
+    """({symbol: cached result}, [uncached symbols]) with duplicates removed"""
+    results = {}
+    missing = []
+    for sym in dict.fromkeys(symbols):
+        cached = get_cached_data(sym)
+        if cached:
+            results[sym] = cached
+        else:
+            missing.append(sym)
+    return results, missing
 
-    prices = pd.Series(prices).dropna()
-    if len(prices) < period + 1:
-        return None
 
-    # log returns = diff(log(price))
-    logp = np.log(prices.replace(0, np.nan))
-    log_returns = logp.diff()
-    vol = log_returns.rolling(window=period).std() * np.sqrt(252)
-    last = vol.iloc[-1]
-    if pd.isna(last):
-        return None
-    return float(last)
+def _build_and_cache(symbol, hist_full=None):
+    data, metrics = _build_stock_data(symbol, hist_full)
+    save_cached_data(symbol, data, metrics)
+    return data, metrics
+
+
+def fetch_stock_data_batch(symbols):
+    """
+    Fetch stock data for several symbols, downloading all uncached 1y histories in one request.
+    Returns {symbol: (display_data, metrics)}.
+    """
+    results, missing = _split_cached(symbols)
+    if missing:
+        histories = _download_histories(missing)
+        for sym in missing:
+            results[sym] = _build_and_cache(sym, histories.get(sym))
+    return results
+
+
+async def fetch_stock_data_async(symbols, concurrency=FETCH_CONCURRENCY):
+    """
+    Concurrent screening over many symbols from an event loop. Histories for all uncached
+    symbols come from one batch download; the per-symbol info fetches then run
+    in worker threads, at most `concurrency` symbols at a time.
+    Returns {symbol: (display_data, metrics)}, or the exception for symbols that failed.
+    """
+    results, missing = _split_cached(symbols)
+    if not missing:
+        return results
+
+    histories = await asyncio.to_thread(_download_histories, missing)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def build(sym):
+        async with semaphore:
+            return await asyncio.to_thread(_build_and_cache, sym, histories.get(sym))
+
+    built = await asyncio.gather(*(build(sym) for sym in missing), return_exceptions=True)
+    results.update(zip(missing, built))
+    return results
 
 
 def fetch_stock_data(symbol):
     """
     Fetch comprehensive stock data with calculated parameters
     OPTIMIZED: Uses caching and single API call for historical data
+
+    Returns (display_data, metrics): formatted strings for the UI, and the same
+    numeric fields as floats/None for analyze_stock / generate_recommendation.
     """
-    # Check cache first
-    cached = get_cached_data(symbol)
-    if cached:
-        return cached
+    return fetch_stock_data_batch([symbol])[symbol]
+
 
+def _fast_info_getter(stock):
+    """
+    fast_info lookup for fields info didn't have. Each fast_info property can cost
+    its own request, so fields are read only when asked for (and at most once).
+    """
+    fast = None
+    values = {}
+
+    def get(field):
+        nonlocal fast
+        if field not in values:
+            try:
+                if fast is None:
+                    fast = stock.fast_info
+                values[field] = fast.get(field)
+            except Exception:
+                values[field] = None
+        return values[field]
+
+    return get
+
+
+def _build_stock_data(symbol, hist_full=None):
+    """Compute all parameters for one symbol; fetches its own history if none was batch-downloaded."""
+    import numpy as np
+    import pandas as pd
+    import yfinance as yf
+
+    # info and history are independent HTTP round-trips; overlap them. Each
+    # thread gets its own Ticker, since a Ticker's lazy caches aren't thread-safe.
     stock = yf.Ticker(symbol)
+    info_future = _FETCH_POOL.submit(lambda: stock.info or {})
+    hist_future = _FETCH_POOL.submit(yf.Ticker(symbol).history, period="1y") if hist_full is None else None
 
     # Try to get info safely (yfinance can be flaky)
     try:
-        info = stock.info or {}
+        info = info_future.result(timeout=FETCH_TIMEOUT)
     except Exception as e:
         logger.debug(f"yfinance info error for {symbol}: {e}")
         info = {}
 
-    # Single historical API call
-    try:
-        hist_full = stock.history(period="1y")
-    except Exception as e:
-        logger.debug(f"yfinance history error for {symbol}: {e}")
-        hist_full = pd.DataFrame()
-
-    # Slice the data in memory
-    hist_1y = hist_full
-    hist_3mo = hist_full.tail(63) if len(hist_full) > 63 else hist_full  # ~3 months
-    hist_1mo = hist_full.tail(21) if len(hist_full) > 21 else hist_full  # ~1 month
-    hist_1d = hist_full.tail(1) if len(hist_full) > 0 else hist_full     # Last day
-
-    # Prefer fast_info for prices when available (often faster / more reliable)
-    fast = {}
-    try:
-        fast = getattr(stock, "fast_info", {}) or {}
-    except Exception:
-        fast = {}
-
-    # Current price & previous close (best-effort fallbacks)
-    current = (
-        info.get("currentPrice")
-        or fast.get("last_price")
-        or (hist_1d["Close"].iloc[-1] if not hist_1d.empty and "Close" in hist_1d else None)
+    # Single historical API call (unless the batch download already has it)
+    if hist_future is not None:
+        try:
+            hist_full = hist_future.result(timeout=FETCH_TIMEOUT)
+        except Exception as e:
+            logger.debug(f"yfinance history error for {symbol}: {e}")
+            hist_full = pd.DataFrame()
+
+    # Column arrays pulled once (None when the column is missing); the 1d/1mo/3mo
+    # windows below are just indices into these, not DataFrame copies
+    close_arr, open_arr, high_arr, low_arr, volume_arr = (
+        hist_full[col].to_numpy(dtype=np.float64, na_value=np.nan) if col in hist_full else None
+        for col in ("Close", "Open", "High", "Low", "Volume")
     )
 
-    prev_close = (
-        info.get("previousClose")
-        or fast.get("previous_close")
-        or (hist_full["Close"].iloc[-2] if len(hist_full) > 1 and "Close" in hist_full else None)
+    def at(arr, i):
+        """arr[i] if the column exists and i is in range, else None"""
+        return arr[i] if arr is not None and -len(arr) <= i < len(arr) else None
+
+    def window_start(arr, window):
+        """First value of the last `window` rows (the whole array when shorter)"""
+        return at(arr, -min(window, len(arr))) if arr is not None and len(arr) else None
+
+    # fast_info only fills fields info lacks; read after info returned, so the
+    # info thread is done with this Ticker
+    fast_get = _fast_info_getter(stock)
+
+    # Quote fields, best-effort: info, then fast_info, then the history row (first truthy value wins)
+    current, prev_close, open_px, day_high, day_low = (
+        info.get(info_key) or fast_get(fast_key) or fallback
+        for (info_key, fast_key), fallback in zip(
+            _QUOTE_SOURCES,
+            (at(close_arr, -1), at(close_arr, -2), at(open_arr, -1), at(high_arr, -1), at(low_arr, -1)),
+        )
     )
 
-    # Calculate technical indicators
-    rsi = calculate_rsi(hist_3mo["Close"], 14) if "Close" in hist_3mo and len(hist_3mo) >= 15 else None
-    macd_val, signal_val = calculate_macd(hist_3mo["Close"]) if "Close" in hist_3mo and len(hist_3mo) >= 26 else (None, None)
-    upper_bb, middle_bb, lower_bb = calculate_bollinger_bands(hist_1mo["Close"], 20) if "Close" in hist_1mo and len(hist_1mo) >= 20 else (None, None, None)
-    volatility = calculate_volatility(hist_1y["Close"], 30) if "Close" in hist_1y and len(hist_1y) >= 31 else None
-
-    # Calculate moving averages
-    sma_20 = hist_1mo["Close"].rolling(window=20).mean().iloc[-1] if "Close" in hist_1mo and len(hist_1mo) >= 20 else None
-    sma_50 = hist_3mo["Close"].rolling(window=50).mean().iloc[-1] if "Close" in hist_3mo and len(hist_3mo) >= 50 else None
-    sma_200 = hist_1y["Close"].rolling(window=200).mean().iloc[-1] if "Close" in hist_1y and len(hist_1y) >= 200 else None
+    # Technical indicators and moving averages, all from one close-price array
+    ind = compute_indicators(close_arr)
+    rsi = ind["rsi"]
+    macd_val, signal_val = ind["macd"], ind["macd_signal"]
+    upper_bb, middle_bb, lower_bb = ind["bb_upper"], ind["bb_middle"], ind["bb_lower"]
+    volatility = ind["volatility"]
+    sma_20, sma_50, sma_200 = ind["sma_20"], ind["sma_50"], ind["sma_200"]
 
     # Price changes
-    pct_change_1d = ((current - prev_close) / prev_close) if (current is not None and prev_close not in (None, 0)) else None
+    def change_from(base):
+        return ((current - base) / base) if (current is not None and base not in (None, 0)) else None
 
-    pct_change_1w = (
-        ((current - hist_1mo["Close"].iloc[-5]) / hist_1mo["Close"].iloc[-5])
-        if (current is not None and "Close" in hist_1mo and len(hist_1mo) >= 5 and hist_1mo["Close"].iloc[-5] not in (None, 0))
-        else None
-    )
-
-    pct_change_1m = (
-        ((current - hist_1mo["Close"].iloc[0]) / hist_1mo["Close"].iloc[0])
-        if (current is not None and "Close" in hist_1mo and len(hist_1mo) > 0 and hist_1mo["Close"].iloc[0] not in (None, 0))
-        else None
-    )
-
-    pct_change_3m = (
-        ((current - hist_3mo["Close"].iloc[0]) / hist_3mo["Close"].iloc[0])
-        if (current is not None and "Close" in hist_3mo and len(hist_3mo) > 0 and hist_3mo["Close"].iloc[0] not in (None, 0))
-        else None
-    )
-
-    pct_change_1y = (
-        ((current - hist_1y["Close"].iloc[0]) / hist_1y["Close"].iloc[0])
-        if (current is not None and "Close" in hist_1y and len(hist_1y) > 0 and hist_1y["Close"].iloc[0] not in (None, 0))
-        else None
-    )
+    pct_change_1d = change_from(prev_close)
+    pct_change_1w = change_from(at(close_arr, -5))
+    pct_change_1m = change_from(window_start(close_arr, 21))  # ~1 month
+    pct_change_3m = change_from(window_start(close_arr, 63))  # ~3 months
+    pct_change_1y = change_from(at(close_arr, 0))
 
     # 52-week metrics
-    week_52_high = hist_1y["High"].max() if (not hist_1y.empty and "High" in hist_1y) else info.get("fiftyTwoWeekHigh")
-    week_52_low = hist_1y["Low"].min() if (not hist_1y.empty and "Low" in hist_1y) else info.get("fiftyTwoWeekLow")
+    week_52_high = float(np.nanmax(high_arr)) if (high_arr is not None and len(high_arr)) else info.get("fiftyTwoWeekHigh")
+    week_52_low = float(np.nanmin(low_arr)) if (low_arr is not None and len(low_arr)) else info.get("fiftyTwoWeekLow")
 
-    distance_from_52w_high = ((current - week_52_high) / week_52_high) if (current is not None and week_52_high not in (None, 0)) else None
-    distance_from_52w_low = ((current - week_52_low) / week_52_low) if (current is not None and week_52_low not in (None, 0)) else None
+    distance_from_52w_high = change_from(week_52_high)
+    distance_from_52w_low = change_from(week_52_low)
 
     # Average volume
-    avg_volume_30d = hist_1mo["Volume"].mean() if (not hist_1mo.empty and "Volume" in hist_1mo) else None
-    volume_ratio = (
-        (hist_1d["Volume"].iloc[-1] / avg_volume_30d)
-        if (not hist_1d.empty and "Volume" in hist_1d and avg_volume_30d not in (None, 0))
-        else None
-    )
+    last_volume = at(volume_arr, -1)
+    avg_volume_30d = float(np.nanmean(volume_arr[-21:])) if last_volume is not None else None
+    volume_ratio = (last_volume / avg_volume_30d) if (last_volume is not None and avg_volume_30d not in (None, 0)) else None
 
-    # Day OHLC best-effort
-    open_px = info.get("open") or fast.get("open") or (hist_1d["Open"].iloc[-1] if not hist_1d.empty and "Open" in hist_1d else None)
-    day_high = info.get("dayHigh") or fast.get("day_high") or (hist_1d["High"].iloc[-1] if not hist_1d.empty and "High" in hist_1d else None)
-    day_low = info.get("dayLow") or fast.get("day_low") or (hist_1d["Low"].iloc[-1] if not hist_1d.empty and "Low" in hist_1d else None)
-    cur_vol = (hist_1d["Volume"].iloc[-1] if not hist_1d.empty and "Volume" in hist_1d else info.get("volume") or fast.get("last_volume"))
-
-    data = {
-        # Company Information
-        "Company Name": info.get("longName", info.get("shortName", "N/A")),
-        "Sector": info.get("sector", "N/A"),
-        "Stock Symbol": symbol,
-        "Industry": info.get("industry", "N/A"),
+    # Volume prefers the history row, then info / fast_info
+    cur_vol = last_volume if last_volume is not None else (info.get("volume") or fast_get("last_volume"))
 
+    # (value, format type) for every numeric field; display strings and the
+    # numeric metrics used by analyze_stock are both derived from this table
+    fields = {
         # Price Data
-        "Current Price": format_value(current, "currency"),
-        "Previous Close": format_value(prev_close, "currency"),
-        "Opening Price": format_value(open_px, "currency"),
-        "Day High": format_value(day_high, "currency"),
-        "Day Low": format_value(day_low, "currency"),
+        "Current Price": (current, "currency"),
+        "Previous Close": (prev_close, "currency"),
+        "Opening Price": (open_px, "currency"),
+        "Day High": (day_high, "currency"),
+        "Day Low": (day_low, "currency"),
 
         # Price Performance
-        "1 Day Change (%)": format_value(pct_change_1d, "percentage"),
-        "1 Week Change (%)": format_value(pct_change_1w, "percentage"),
-        "1 Month Change (%)": format_value(pct_change_1m, "percentage"),
-        "3 Month Change (%)": format_value(pct_change_3m, "percentage"),
-        "1 Year Change (%)": format_value(pct_change_1y, "percentage"),
+        "1 Day Change (%)": (pct_change_1d, "percentage"),
+        "1 Week Change (%)": (pct_change_1w, "percentage"),
+        "1 Month Change (%)": (pct_change_1m, "percentage"),
+        "3 Month Change (%)": (pct_change_3m, "percentage"),
+        "1 Year Change (%)": (pct_change_1y, "percentage"),
 
         # Market Metrics
-        "Market Capitalization": format_value(info.get("marketCap"), "crores"),
-        "Enterprise Value": format_value(info.get("enterpriseValue"), "crores"),
+        "Market Capitalization": (info.get("marketCap"), "crores"),
+        "Enterprise Value": (info.get("enterpriseValue"), "crores"),
 
         # Volume Metrics
-        "Current Volume": format_value(cur_vol, "number"),
-        "Average Volume (30 Days)": format_value(avg_volume_30d, "number"),
-        "Volume Ratio": format_value(volume_ratio, "ratio"),
+        "Current Volume": (cur_vol, "number"),
+        "Average Volume (30 Days)": (avg_volume_30d, "number"),
+        "Volume Ratio": (volume_ratio, "ratio"),
 
         # Valuation Ratios
-        "P/E Ratio": format_value(info.get("trailingPE"), "ratio"),
-        "Forward P/E Ratio": format_value(info.get("forwardPE"), "ratio"),
-        "Price to Book Ratio": format_value(info.get("priceToBook"), "ratio"),
-        "Price to Sales Ratio": format_value(info.get("priceToSalesTrailing12Months"), "ratio"),
-        "Earnings Per Share (EPS)": format_value(info.get("trailingEps"), "currency"),
-        "Forward EPS": format_value(info.get("forwardEps"), "currency"),
+        "P/E Ratio": (info.get("trailingPE"), "ratio"),
+        "Forward P/E Ratio": (info.get("forwardPE"), "ratio"),
+        "Price to Book Ratio": (info.get("priceToBook"), "ratio"),
+        "Price to Sales Ratio": (info.get("priceToSalesTrailing12Months"), "ratio"),
+        "Earnings Per Share (EPS)": (info.get("trailingEps"), "currency"),
+        "Forward EPS": (info.get("forwardEps"), "currency"),
 
         # Profitability Metrics
-        "Revenue Growth": format_value(info.get("revenueGrowth"), "percentage"),
-        "Profit Margin": format_value(info.get("profitMargins"), "percentage"),
-        "Operating Margin": format_value(info.get("operatingMargins"), "percentage"),
-        "Gross Margin": format_value(info.get("grossMargins"), "percentage"),
-        "Return on Equity (ROE)": format_value(info.get("returnOnEquity"), "percentage"),
-        "Return on Assets (ROA)": format_value(info.get("returnOnAssets"), "percentage"),
+        "Revenue Growth": (info.get("revenueGrowth"), "percentage"),
+        "Profit Margin": (info.get("profitMargins"), "percentage"),
+        "Operating Margin": (info.get("operatingMargins"), "percentage"),
+        "Gross Margin": (info.get("grossMargins"), "percentage"),
+        "Return on Equity (ROE)": (info.get("returnOnEquity"), "percentage"),
+        "Return on Assets (ROA)": (info.get("returnOnAssets"), "percentage"),
 
         # Financial Health
-        "Debt to Equity Ratio": format_value(info.get("debtToEquity"), "ratio"),
-        "Current Ratio": format_value(info.get("currentRatio"), "ratio"),
-        "Quick Ratio": format_value(info.get("quickRatio"), "ratio"),
+        "Debt to Equity Ratio": (info.get("debtToEquity"), "ratio"),
+        "Current Ratio": (info.get("currentRatio"), "ratio"),
+        "Quick Ratio": (info.get("quickRatio"), "ratio"),
 
         # Dividend Information
-        "Dividend Yield": format_value(info.get("dividendYield"), "percentage"),
-        "Dividend Rate": format_value(info.get("dividendRate"), "currency"),
-        "Payout Ratio": format_value(info.get("payoutRatio"), "percentage"),
+        "Dividend Yield": (info.get("dividendYield"), "percentage"),
+        "Dividend Rate": (info.get("dividendRate"), "currency"),
+        "Payout Ratio": (info.get("payoutRatio"), "percentage"),
 
         # Technical Indicators
-        "RSI (14)": format_value(rsi, "ratio"),
-        "MACD": format_value(macd_val, "ratio"),
-        "MACD Signal": format_value(signal_val, "ratio"),
-        "Annual Volatility": format_value(volatility, "percentage"),
+        "RSI (14)": (rsi, "ratio"),
+        "MACD": (macd_val, "ratio"),
+        "MACD Signal": (signal_val, "ratio"),
+        "Annual Volatility": (volatility, "percentage"),
 
         # Moving Averages
-        "20 Day SMA": format_value(sma_20, "currency"),
-        "50 Day SMA": format_value(sma_50, "currency"),
-        "200 Day SMA": format_value(sma_200, "currency"),
+        "20 Day SMA": (sma_20, "currency"),
+        "50 Day SMA": (sma_50, "currency"),
+        "200 Day SMA": (sma_200, "currency"),
 
         # 52 Week Range
-        "52 Week High": format_value(week_52_high, "currency"),
-        "52 Week Low": format_value(week_52_low, "currency"),
-        "Distance from 52 Week High (%)": format_value(distance_from_52w_high, "percentage"),
-        "Distance from 52 Week Low (%)": format_value(distance_from_52w_low, "percentage"),
+        "52 Week High": (week_52_high, "currency"),
+        "52 Week Low": (week_52_low, "currency"),
+        "Distance from 52 Week High (%)": (distance_from_52w_high, "percentage"),
+        "Distance from 52 Week Low (%)": (distance_from_52w_low, "percentage"),
 
         # Bollinger Bands
-        "Bollinger Band Upper": format_value(upper_bb, "currency"),
-        "Bollinger Band Middle": format_value(middle_bb, "currency"),
-        "Bollinger Band Lower": format_value(lower_bb, "currency"),
+        "Bollinger Band Upper": (upper_bb, "currency"),
+        "Bollinger Band Middle": (middle_bb, "currency"),
+        "Bollinger Band Lower": (lower_bb, "currency"),
 
         # Additional Metrics
-        "Book Value": format_value(info.get("bookValue"), "currency"),
+        "Book Value": (info.get("bookValue"), "currency"),
+    }
+
+    data = {
+        # Company Information
+        "Company Name": info.get("longName", info.get("shortName", "N/A")),
+        "Sector": info.get("sector", "N/A"),
+        "Stock Symbol": symbol,
+        "Industry": info.get("industry", "N/A"),
     }
+    data.update((name, format_value(value, value_type)) for name, (value, value_type) in fields.items())
+    metrics = {name: _metric_value(value, value_type) for name, (value, value_type) in fields.items()}
 
-    # Cache the result
-    save_cached_data(symbol, data)
-    return data
+    return data, metrics
 
 
 # ============================================================================
 # STOCK RECOMMENDER
 # ============================================================================
 
-def parse_value(value_str):
-    """Extract numeric value from formatted strings"""
-    if value_str == "N/A" or value_str is None:
-        return None
-
-    s = str(value_str).strip()
-    if not s or s.lower() in {"nan", "none"}:
-        return None
-
-    # Handle accounting negatives like (123.45)
-    neg = False
-    if s.startswith("(") and s.endswith(")"):
-        neg = True
-        s = s[1:-1].strip()
-
-    cleaned = (
-        s.replace("₹", "")
-        .replace("Cr", "")
-        .replace(",", "")
-        .replace("%", "")
-        .strip()
-    )
-
-    try:
-        val = float(cleaned)
-        return -val if neg else val
-    except (ValueError, AttributeError):
-        return None
-
-
-def analyze_stock(data):
-    """Analyze stock and generate signals"""
+def analyze_stock(metrics):
+    """Analyze stock and generate signals from the numeric metrics returned by fetch_stock_data"""
     signals = {"bullish": [], "bearish": []}
 
-    # Parse metrics
-    current = parse_value(data.get("Current Price"))
-    pe = parse_value(data.get("P/E Ratio"))
-    fwd_pe = parse_value(data.get("Forward P/E Ratio"))
-    roe = parse_value(data.get("Return on Equity (ROE)"))
-    debt_eq = parse_value(data.get("Debt to Equity Ratio"))
-    profit_margin = parse_value(data.get("Profit Margin"))
-    revenue_growth = parse_value(data.get("Revenue Growth"))
-    pb = parse_value(data.get("Price to Book Ratio"))
-    current_ratio = parse_value(data.get("Current Ratio"))
-    rsi = parse_value(data.get("RSI (14)"))
-    sma_20 = parse_value(data.get("20 Day SMA"))
-    sma_50 = parse_value(data.get("50 Day SMA"))
-    sma_200 = parse_value(data.get("200 Day SMA"))
-    dist_52w_high = parse_value(data.get("Distance from 52 Week High (%)"))
-    macd = parse_value(data.get("MACD"))
-    macd_signal = parse_value(data.get("MACD Signal"))
-    chg_1m = parse_value(data.get("1 Month Change (%)"))
-    chg_3m = parse_value(data.get("3 Month Change (%)"))
-    chg_1y = parse_value(data.get("1 Year Change (%)"))
-    volume_ratio = parse_value(data.get("Volume Ratio"))
-    dividend_yield = parse_value(data.get("Dividend Yield"))
+    current = metrics.get("Current Price")
+    pe = metrics.get("P/E Ratio")
+    fwd_pe = metrics.get("Forward P/E Ratio")
+    roe = metrics.get("Return on Equity (ROE)")
+    debt_eq = metrics.get("Debt to Equity Ratio")
+    profit_margin = metrics.get("Profit Margin")
+    revenue_growth = metrics.get("Revenue Growth")
+    pb = metrics.get("Price to Book Ratio")
+    current_ratio = metrics.get("Current Ratio")
+    rsi = metrics.get("RSI (14)")
+    sma_20 = metrics.get("20 Day SMA")
+    sma_50 = metrics.get("50 Day SMA")
+    sma_200 = metrics.get("200 Day SMA")
+    dist_52w_high = metrics.get("Distance from 52 Week High (%)")
+    macd = metrics.get("MACD")
+    macd_signal = metrics.get("MACD Signal")
+    chg_1m = metrics.get("1 Month Change (%)")
+    chg_3m = metrics.get("3 Month Change (%)")
+    chg_1y = metrics.get("1 Year Change (%)")
+    volume_ratio = metrics.get("Volume Ratio")
+    dividend_yield = metrics.get("Dividend Yield")
 
     # Normalize Debt-to-Equity (some feeds provide 120 instead of 1.20)
     if debt_eq is not None and debt_eq > 10:
@@ -599,76 +887,79 @@ def calculate_recommendation(signals):
     }
 
 
+_BRACKET_TRANS = str.maketrans("", "", "[]")
+
+
+@functools.lru_cache(maxsize=1024)
+def _format_reason(prefix, reason):
+    """'Category: detail' -> 'Prefix - Category: detail' (the same signal strings recur across stocks)"""
+    clean_reason = reason.translate(_BRACKET_TRANS)
+    category, sep, detail = clean_reason.partition(":")
+    if sep:
+        return f"{prefix} - {category.strip()}: {detail.strip()}"
+    return f"{prefix}: {clean_reason}"
+
+
+def _dominant_reasons(main, other, prefix):
+    """Top 4 from the dominant side, plus the strongest counterpoint (or a 5th main reason)"""
+    selected = main[:4]
+    if other:
+        selected.append(_format_reason(prefix, other[0]))
+    else:
+        selected.extend(main[4:5])
+    return selected
+
+
+def _balanced_reasons(bullish, bearish):
+    """Alternate strengths and concerns when Hold leads"""
+    selected = []
+    if bullish:
+        selected.append(_format_reason("Strength", bullish[0]))
+    if bearish:
+        selected.append(_format_reason("Concern", bearish[0]))
+    selected.extend(bullish[1:2])
+    selected.extend(bearish[1:2])
+    selected.extend(bullish[2:3] or bearish[2:3])
+    return selected
+
+
+# (predicate(buy, sell, hold), selector(bullish, bearish)); the first matching rule wins
+_SELECTION_RULES = (
+    (lambda buy, sell, hold: buy > 60, lambda bull, bear: _dominant_reasons(bull, bear, "Risk")),
+    (lambda buy, sell, hold: sell > 60, lambda bull, bear: _dominant_reasons(bear, bull, "Opportunity")),
+    (lambda buy, sell, hold: hold > buy and hold > sell, _balanced_reasons),
+    (lambda buy, sell, hold: buy > sell, lambda bull, bear: bull[:3] + bear[:2]),
+    (lambda buy, sell, hold: True, lambda bull, bear: bear[:3] + bull[:2]),
+)
+
+
+def _pct(val):
+    """Recommendation share as float; accepts raw floats or legacy '12.5%' strings"""
+    try:
+        if isinstance(val, str):
+            return float(val.replace("%", "").strip())
+        return float(val)
+    except Exception:
+        return 0.0
+
+
 def get_top_reasons(signals, recommendation):
     """Select top 5 most impactful and suitable reasons based on conviction"""
-    def to_float(val):
-        try:
-            if isinstance(val, str):
-                return float(val.replace("%", "").strip())
-            return float(val)
-        except Exception:
-            return 0.0
-
-    buy_pct = to_float(recommendation.get("Buy", 0))
-    sell_pct = to_float(recommendation.get("Sell", 0))
-    hold_pct = to_float(recommendation.get("Hold", 0))
+    buy_pct = _pct(recommendation.get("Buy", 0))
+    sell_pct = _pct(recommendation.get("Sell", 0))
+    hold_pct = _pct(recommendation.get("Hold", 0))
 
     bullish = signals.get("bullish", [])
     bearish = signals.get("bearish", [])
 
-    def format_reason(prefix, reason):
-        clean_reason = reason.replace("[", "").replace("]", "")
-        if ":" in clean_reason:
-            parts = clean_reason.split(":", 1)
-            return f"{prefix} - {parts[0].strip()}: {parts[1].strip()}"
-        return f"{prefix}: {clean_reason}"
-
-    if buy_pct > 60:
-        selected = bullish[:4]
-        if bearish:
-            selected.append(format_reason("Risk", bearish[0]))
-        elif len(bullish) >= 5:
-            selected.append(bullish[4])
-        return selected[:5]
-
-    elif sell_pct > 60:
-        selected = bearish[:4]
-        if bullish:
-            selected.append(format_reason("Opportunity", bullish[0]))
-        elif len(bearish) >= 5:
-            selected.append(bearish[4])
-        return selected[:5]
-
-    elif hold_pct > buy_pct and hold_pct > sell_pct:
-        selected = []
-        if bullish:
-            selected.append(format_reason("Strength", bullish[0]))
-        if bearish:
-            selected.append(format_reason("Concern", bearish[0]))
-        if len(bullish) > 1:
-            selected.append(bullish[1])
-        if len(bearish) > 1:
-            selected.append(bearish[1])
-        if len(bullish) > 2:
-            selected.append(bullish[2])
-        elif len(bearish) > 2:
-            selected.append(bearish[2])
-        return selected[:5]
-
-    elif buy_pct > sell_pct:
-        selected = bullish[:3]
-        selected.extend(bearish[:2])
-        return selected[:5]
-
-    else:
-        selected = bearish[:3]
-        selected.extend(bullish[:2])
-        return selected[:5]
+    for predicate, select in _SELECTION_RULES:
+        if predicate(buy_pct, sell_pct, hold_pct):
+            return select(bullish, bearish)[:5]
 
 
-def generate_recommendation(stock_data):
-    """Generate recommendation from stock data"""
-    signals = analyze_stock(stock_data)
+def generate_recommendation(metrics):
+    """Generate recommendation from the numeric metrics returned by fetch_stock_data"""
+    signals = analyze_stock(metrics)
     recommendation = calculate_recommendation(signals)
     reasons = get_top_reasons(signals, recommendation)
 
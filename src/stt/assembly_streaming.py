@@ -11,18 +11,106 @@ from assemblyai.streaming.v3 import (
     TurnEvent,
 )
 import logging
+import time
+import numpy as np
 import pyaudio
 from typing import Callable, Optional
 from queue import Queue
+from collections import deque
 import threading
 import os
 from dotenv import load_dotenv
 
+try:
+    import sounddevice as sd
+except ImportError:  # fall back to AssemblyAI's PyAudio MicrophoneStream
+    sd = None
+
 # Load environment variables
 load_dotenv()
 
 logger = logging.getLogger(__name__)
 
+# Pending transcripts kept per session; the oldest are dropped if consumers stall
+TRANSCRIPT_BUFFER_SIZE = 256
+
+# Local microphone capture: PCM16 mono at SAMPLE_RATE, MIC_BLOCKSIZE frames per
+# PortAudio callback, sent to AssemblyAI in MIC_CHUNK_MS chunks.
+# 16 kHz is AssemblyAI's native streaming rate; anything higher is resampled
+# server-side, so 44.1 kHz only cost ~2.76x the uplink bytes. The browser client
+# (AI_Voice.jsx) captures at the same rate.
+SAMPLE_RATE = 16000
+MIC_BLOCKSIZE = 128
+MIC_CHUNK_MS = 50
+MIC_RING_SECONDS = 2
+
+
+class _MicRingStream:
+    """
+    Microphone capture over sounddevice.RawInputStream feeding a preallocated
+    int16 ring buffer. The PortAudio callback only copies samples in and bumps
+    the write index; iteration (on the streaming thread) drains fixed-size chunks.
+    Single producer / single consumer: each index has one writer, so plain int
+    stores under the GIL are enough and no lock is taken in the audio callback.
+    """
+
+    def __init__(self, sample_rate: int = SAMPLE_RATE, device_index: Optional[int] = None):
+        self._ring = np.zeros(sample_rate * MIC_RING_SECONDS, dtype=np.int16)
+        self._size = len(self._ring)
+        self._head = 0  # total samples written (producer only)
+        self._tail = 0  # total samples read (consumer only)
+        self.overruns = 0
+        self._chunk = sample_rate * MIC_CHUNK_MS // 1000
+        self._poll = MIC_CHUNK_MS / 2000
+        self._closed = False
+        self._stream = sd.RawInputStream(
+            samplerate=sample_rate,
+            blocksize=MIC_BLOCKSIZE,
+            dtype="int16",
+            channels=1,
+            device=device_index,
+            callback=self._on_audio,
+        )
+        self._stream.start()
+
+    def _on_audio(self, indata, frames, time_info, status):
+        head = self._head
+        if head + frames - self._tail > self._size:
+            # Consumer fell behind a full ring: drop this block rather than block the audio thread
+            self.overruns += 1
+            return
+        samples = np.frombuffer(indata, dtype=np.int16, count=frames)
+        start = head % self._size
+        first = min(frames, self._size - start)
+        self._ring[start:start + first] = samples[:first]
+        if first < frames:
+            self._ring[:frames - first] = samples[first:]
+        self._head = head + frames
+
+    def __iter__(self):
+        chunk = self._chunk
+        while not self._closed:
+            tail = self._tail
+            if self._head - tail < chunk:
+                time.sleep(self._poll)
+                continue
+            start = tail % self._size
+            end = start + chunk
+            if end <= self._size:
+                data = self._ring[start:end].tobytes()
+            else:
+                data = self._ring[start:].tobytes() + self._ring[:end - self._size].tobytes()
+            self._tail = tail + chunk
+            yield data
+
+    def close(self):
+        self._closed = True
+        self._stream.stop()
+        self._stream.close()
+        if self.overruns:
+            logger.warning(f"Microphone ring buffer overran {self.overruns} times")
+
+
 class VoiceToTextService:
     def __init__(self):
         # Load API key from environment
@@ -33,9 +121,15 @@ class VoiceToTextService:
         
         self.client = None
         self.is_streaming = False
-        self.transcript_queue = Queue()
+        self._transcripts = deque(maxlen=TRANSCRIPT_BUFFER_SIZE)
+        self._transcripts_cond = threading.Condition()
         self.audio_queue = Queue()
         self.on_transcript_callback = None
+        self._mic_stream = None
+        # PortAudio is initialised once and kept for the service's lifetime; a
+        # successful probe is remembered so later sessions skip it
+        self._pa = None
+        self._mic_probed = False
         
     def set_transcript_callback(self, callback: Callable[[str], None]):
         """Set callback function to receive transcripts"""
@@ -53,7 +147,13 @@ class VoiceToTextService:
                 "is_final": event.end_of_turn,
                 "is_formatted": event.turn_is_formatted
             }
-            self.transcript_queue.put(transcript_data)
+            with self._transcripts_cond:
+                # A pending partial turn is superseded by the next update of the same turn
+                if self._transcripts and not self._transcripts[-1]["is_final"]:
+                    self._transcripts[-1] = transcript_data
+                else:
+                    self._transcripts.append(transcript_data)
+                self._transcripts_cond.notify()
             
             if self.on_transcript_callback:
                 self.on_transcript_callback(transcript_data)
@@ -78,30 +178,32 @@ class VoiceToTextService:
     def test_microphone(self) -> tuple[bool, str]:
         """Test if microphone is accessible"""
         try:
-            p = pyaudio.PyAudio()
-            default_input = p.get_default_input_device_info()
+            if self._pa is None:
+                self._pa = pyaudio.PyAudio()
+            default_input = self._pa.get_default_input_device_info()
             
-            test_stream = p.open(
+            test_stream = self._pa.open(
                 format=pyaudio.paInt16,
                 channels=1,
-                rate=16000,
+                rate=SAMPLE_RATE,
                 input=True,
                 frames_per_buffer=1024
             )
             test_stream.close()
-            p.terminate()
+            self._mic_probed = True
             
             return True, f"Microphone ready: {default_input['name']}"
         except Exception as e:
+            self._mic_probed = False
             return False, f"Microphone error: {str(e)}"
     
     def start_streaming(self, device_index: Optional[int] = None, use_mic: bool = False):
-        """Start streaming transcription"""
+        """Start streaming transcription (PCM16 mono at SAMPLE_RATE for both mic and external audio)"""
         if self.is_streaming:
             raise RuntimeError("Already streaming")
         
-        # Test microphone only if use_mic is True
-        if use_mic:
+        # Test microphone only if use_mic is True and it hasn't been verified yet
+        if use_mic and not self._mic_probed:
             is_available, message = self.test_microphone()
             if not is_available:
                 raise RuntimeError(message)
@@ -123,7 +225,7 @@ class VoiceToTextService:
         # Connect
         self.client.connect(
             StreamingParameters(
-                sample_rate=44100,
+                sample_rate=SAMPLE_RATE,
                 format_turns=True
             )
         )
@@ -177,11 +279,15 @@ class VoiceToTextService:
     def _stream_audio(self, device_index: Optional[int] = None):
         """Internal method to stream audio from local microphone (legacy/local only)"""
         try:
-            mic_params = {"sample_rate": 44100}
-            if device_index is not None:
-                mic_params["device_index"] = device_index
+            if sd is not None:
+                self._mic_stream = _MicRingStream(SAMPLE_RATE, device_index)
+            else:
+                mic_params = {"sample_rate": SAMPLE_RATE}
+                if device_index is not None:
+                    mic_params["device_index"] = device_index
+                self._mic_stream = aai.extras.MicrophoneStream(**mic_params)
             
-            self.client.stream(aai.extras.MicrophoneStream(**mic_params))
+            self.client.stream(self._mic_stream)
         except Exception as e:
             logger.error(f"Streaming error (Mic): {e}")
             self.is_streaming = False
@@ -189,14 +295,33 @@ class VoiceToTextService:
     def stop_streaming(self):
         """Stop streaming transcription"""
         if self.client and self.is_streaming:
+            if self._mic_stream is not None:
+                self._mic_stream.close()
+                self._mic_stream = None
             self.client.disconnect(terminate=True)
             self.is_streaming = False
             return "Streaming stopped"
         return "Not streaming"
     
     def get_transcript(self, timeout: float = 1.0) -> Optional[dict]:
-        """Get next transcript from queue"""
-        try:
-            return self.transcript_queue.get(timeout=timeout)
-        except:
-            return None
\ No newline at end of file
+        """Get next transcript from the buffer"""
+        with self._transcripts_cond:
+            if not self._transcripts:
+                self._transcripts_cond.wait(timeout)
+            return self._transcripts.popleft() if self._transcripts else None
+    
+    def get_transcripts(self, max_items: int = 32, timeout: float = 1.0) -> list[dict]:
+        """Block once for a transcript, then drain whatever else is queued (up to max_items)"""
+        with self._transcripts_cond:
+            if not self._transcripts:
+                self._transcripts_cond.wait(timeout)
+            count = min(max_items, len(self._transcripts))
+            return [self._transcripts.popleft() for _ in range(count)]
+    
+    def __del__(self):
+        pa = getattr(self, "_pa", None)
+        if pa is not None:
+            try:
+                pa.terminate()
+            except Exception:
+                pass
@@ -1,24 +1,41 @@
+import functools
+import os
 import assemblyai as aai
+from dotenv import load_dotenv
 
-# Replace with your API key
-api_key = "75a96a1964d54a369cb8f0c0fa28d521"
+load_dotenv()
 
-def transcribe_audio_file(audio_file_path):
-    """Transcribe an audio file"""
-    aai.settings.api_key = api_key
-    
-    transcriber = aai.Transcriber()
-    
+# API key comes from the environment, same as the streaming service
+aai.settings.api_key = os.getenv("ASSEMBLY_AI")
+_transcriber = aai.Transcriber()
+
+class TranscriptionError(RuntimeError):
+    pass
+
+
+@functools.lru_cache(maxsize=64)
+def _transcribe_cached(audio_file_path):
+    # Raises on failure, and lru_cache never stores an exception, so only
+    # successful transcripts are memoised and a failed path can be retried
     print(f"Uploading and transcribing: {audio_file_path}")
-    transcript = transcriber.transcribe(audio_file_path)
-    
+    transcript = _transcriber.transcribe(audio_file_path)
     if transcript.status == aai.TranscriptStatus.error:
-        print(f"Error: {transcript.error}")
-    else:
-        print(f"\nTranscription:\n{transcript.text}")
-    
+        raise TranscriptionError(transcript.error)
     return transcript.text
 
+
+def transcribe_audio_file(audio_file_path):
+    """Transcribe an audio file (successful results memoised per path for the life of the process)"""
+    try:
+        text = _transcribe_cached(audio_file_path)
+    except TranscriptionError as e:
+        print(f"Error: {e}")
+        return None
+
+    print(f"\nTranscription:\n{text}")
+    return text
+
 # Usage
-audio_file = "path/to/your/audio.mp3"  # or .wav, .m4a, etc.
-transcribe_audio_file(audio_file)
\ No newline at end of file
+if __name__ == "__main__":
+    audio_file = "path/to/your/audio.mp3"  # or .wav, .m4a, etc.
+    transcribe_audio_file(audio_file)
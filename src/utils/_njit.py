@@ -0,0 +1,31 @@
+"""
+Optional numba JIT for small numeric kernels.
+
+`@njit` / `@njit(cache=True)` compiles the function with numba on its first call
+(so importing a module that defines kernels never imports numba itself). When
+numba is not installed, the plain Python function runs instead.
+"""
+
+import functools
+
+
+def njit(fn=None, **options):
+    def decorate(func):
+        compiled = None
+
+        @functools.wraps(func)
+        def call(*args):
+            nonlocal compiled
+            if compiled is None:
+                try:
+                    from numba import njit as numba_njit
+                except ImportError:
+                    compiled = func
+                else:
+                    compiled = numba_njit(**options)(func)
+            return compiled(*args)
+
+        call.py_func = func
+        return call
+
+    return decorate(fn) if fn is not None else decorate
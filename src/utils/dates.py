@@ -0,0 +1,19 @@
+"""
+Cached "today" strings for prompts and search queries.
+
+strftime runs once per (day, format); the cache is keyed on the date ordinal, so
+the value rolls over at midnight without any expiry bookkeeping.
+"""
+
+import functools
+from datetime import date
+
+
+@functools.lru_cache(maxsize=8)
+def _date_fmt(ordinal: int, fmt: str) -> str:
+    return date.fromordinal(ordinal).strftime(fmt)
+
+
+def today_str(fmt: str = "%B %d, %Y") -> str:
+    """Today's date as `fmt` ('January 01, 2025' by default)."""
+    return _date_fmt(date.today().toordinal(), fmt)
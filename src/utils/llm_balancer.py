@@ -1,4 +1,5 @@
 import os
+import itertools
 import logging
 from typing import List, Optional
 from dotenv import load_dotenv
@@ -8,10 +9,15 @@ load_dotenv(override=True)
 
 logger = logging.getLogger("GroqBalancer")
 
+# Backslashes (common in multiline envs) and quotes stripped from each key
+_TRANS = str.maketrans("", "", "\\'\"")
+
 class GroqBalancer:
     def __init__(self):
         self._keys: List[str] = self._load_keys()
-        self._index: int = 0
+        # next() on an itertools.count is atomic under the GIL, so concurrent callers
+        # each get a distinct ticket without a read-modify-write race
+        self._counter = itertools.count()
         
         if not self._keys:
             # Fallback to single key if the list format isn't found
@@ -22,6 +28,9 @@ class GroqBalancer:
             else:
                 logger.error("No Groq API keys found in environment variables!")
 
+        # Masked forms for logging, computed once rather than per dispatch
+        self._masked: List[str] = [f"{k[:4]}...{k[-4:]}" if len(k) > 8 else "INVALID" for k in self._keys]
+
     def _load_keys(self) -> List[str]:
         """
         Loads keys from .env. 
@@ -35,23 +44,24 @@ class GroqBalancer:
         keys = []
         for k in raw_keys.split(","):
             # Clean up: remove whitespace, backslashes (common in multiline envs), and quotes
-            k = k.strip().replace("\\", "").replace("'", "").replace('"', "")
+            k = k.strip().translate(_TRANS)
             
             if not k:
                 continue
             
             # Simple validation for Groq keys (usually start with gsk_)
             # We allow non-gsk keys if they are not placeholders, but warn
-            if "place" in k.lower() or "your_key" in k.lower():
-                logger.warning(f"Ignoring placeholder key: {k}")
+            lowered = k.lower()
+            if "place" in lowered or "your_key" in lowered:
+                logger.warning("Ignoring placeholder key: %s", k)
                 continue
                 
             if not k.startswith("gsk_"):
-                logger.warning(f"Key '{k[:5]}...' does not start with 'gsk_', might be invalid.")
+                logger.warning("Key '%s...' does not start with 'gsk_', might be invalid.", k[:5])
             
             keys.append(k)
             
-        logger.info(f"Loaded {len(keys)} valid Groq API keys for load balancing.")
+        logger.info("Loaded %d valid Groq API keys for load balancing.", len(keys))
         return keys
 
     def get_next_key(self) -> Optional[str]:
@@ -61,12 +71,12 @@ class GroqBalancer:
         if not self._keys:
             return None
             
-        key = self._keys[self._index]
-        self._index = (self._index + 1) % len(self._keys)
+        index = next(self._counter) % len(self._keys)
+        key = self._keys[index]
         
         # Log masked key for debugging
-        masked_key = f"{key[:4]}...{key[-4:]}" if len(key) > 8 else "INVALID"
-        logger.info(f"Using Groq Key Index {self._index}: {masked_key}")
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("Using Groq Key Index %d: %s", index, self._masked[index])
         
         return key
 